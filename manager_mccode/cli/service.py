@@ -5,6 +5,7 @@ import subprocess
 from pathlib import Path
 from manager_mccode.config.logging_config import setup_logging
 from manager_mccode.services.database import DatabaseManager
+from manager_mccode.services.image import SCREENSHOT_EXTENSIONS
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
@@ -118,8 +119,9 @@ def stop():
         # Clean up only temporary files
         temp_dir = Path(settings.TEMP_DIR)
         if temp_dir.exists():
-            for file in temp_dir.glob("*.png"):
-                file.unlink()
+            for file in temp_dir.glob("screenshot_*"):
+                if file.name.endswith(SCREENSHOT_EXTENSIONS):
+                    file.unlink()
             
         click.echo("Service stopped!")
     except Exception as e:
@@ -170,7 +172,7 @@ def inspect():
             ])
             
             table.add_row(
-                summary.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+                summary.timestamp.isoformat(sep=" ", timespec="seconds"),
                 summary.summary,
                 activities
             )
@@ -205,7 +207,10 @@ def check():
                 
         # Check screenshots directory
         screenshots_dir = Path("temp_screenshots")
-        screenshot_count = len(list(screenshots_dir.glob("*.png"))) if screenshots_dir.exists() else 0
+        screenshot_count = sum(
+            1 for file in screenshots_dir.glob("screenshot_*")
+            if file.name.endswith(SCREENSHOT_EXTENSIONS)
+        ) if screenshots_dir.exists() else 0
         
         # Display status
         console.print("\n[bold cyan]Service Status Check[/bold cyan]")
@@ -288,8 +293,8 @@ def stats():
         # Time range info
         time_range = stats['time_range']
         if time_range['oldest'] and time_range['newest']:
-            oldest = datetime.fromisoformat(time_range['oldest'])
-            newest = datetime.fromisoformat(time_range['newest'])
+            oldest = time_range['oldest']
+            newest = time_range['newest']
             date_range = newest - oldest
             
             time_panel = Panel(
@@ -333,7 +338,7 @@ def optimize():
     """Optimize database performance"""
     try:
         db = DatabaseManager()
-        db._optimize_database()
+        db.maintenance()
         console = Console()
         console.print("[green]Database optimization complete[/green]")
     except Exception as e:
@@ -348,8 +353,9 @@ def clear():
         conn = db.get_connection()
         cursor = conn.cursor()
         
-        # Disable foreign key checks temporarily
+        # Disable foreign key checks temporarily (no-op inside a transaction)
         cursor.execute("PRAGMA foreign_keys = OFF")
+        cursor.execute("BEGIN IMMEDIATE")
         
         # Get all tables
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
@@ -357,11 +363,12 @@ def clear():
         
         # Delete data from all tables
         for (table_name,) in tables:
-            if table_name != 'sqlite_sequence':  # Skip SQLite internal table
+            # Skip SQLite internal table and the trigger-maintained counters
+            if table_name not in ('sqlite_sequence', 'counters'):
                 cursor.execute(f"DELETE FROM {table_name}")
         
-        cursor.execute("PRAGMA foreign_keys = ON")
         conn.commit()
+        cursor.execute("PRAGMA foreign_keys = ON")
         
         click.echo("Database cleared successfully")
     except Exception as e:
@@ -526,7 +533,7 @@ def debug_db():
                     console.print(f"{cat}: {count}")
                     
         finally:
-            conn.close()
+            db.close()
             
     except Exception as e:
         logger.error(f"Failed to debug database: {e}")
@@ -14,6 +14,7 @@ class Settings(BaseSettings):
     DEFAULT_BATCH_SIZE: int = 12
     DEFAULT_BATCH_INTERVAL_SECONDS: int = 120
     CLEANUP_INTERVAL_MINUTES: int = 60  # Run cleanup hourly instead of every 10 seconds
+    SCREENSHOT_FORMAT: str = "JPEG"  # JPEG or WEBP; WebP is ~25-35% smaller at similar quality
     
     # Path Configuration
     BASE_DIR: Path = Path(__file__).parent.parent.parent
@@ -22,6 +23,13 @@ class Settings(BaseSettings):
     LOG_DIR: Path = BASE_DIR / "logs"
     DEFAULT_DB_PATH: Path = BASE_DIR / "manager_mccode.db"
     
+    # Database Tuning
+    DB_CACHE_SIZE_MB: int = 64  # Page cache per connection (writer and reader each)
+    DB_MMAP_SIZE_MB: int = 256  # Memory-mapped read window; 0 disables mmap
+    DB_WAL_AUTOCHECKPOINT_PAGES: int = 1000
+    DB_JOURNAL_SIZE_LIMIT_MB: int = 32  # WAL file is truncated back to this after checkpoints
+    DB_SORTER_THREADS: int = 4  # Helper threads for large sorts/GROUP BYs; 0 disables
+    
     # Web Configuration
     WEB_PORT: int = 8000
     WEB_HOST: str = "localhost"
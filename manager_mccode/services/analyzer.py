@@ -1,5 +1,6 @@
 import logging
 import json
+from collections import Counter
 import google.generativeai as genai
 from datetime import datetime
 from manager_mccode.models.screen_summary import ScreenSummary, Activity, FocusIndicators, Context
@@ -10,6 +11,7 @@ import asyncio
 from typing import List, Dict
 from pathlib import Path
 from manager_mccode.services.errors import AnalyzerError
+from manager_mccode.services.image import screenshot_mime_type
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +42,7 @@ class GeminiAnalyzer:
         try:
             with open(image_path, 'rb') as img_file:
                 image_part = {
-                    "mime_type": "image/png",
+                    "mime_type": screenshot_mime_type(image_path),
                     "data": img_file.read()
                 }
             
@@ -166,32 +168,53 @@ class GeminiAnalyzer:
 
     def analyze_focus_patterns(self, activities: List[Activity]) -> Dict:
         """Analyze focus patterns from activities"""
+        sessions = self._group_into_sessions(activities)
+        # Sessions built from a newest-first walk run backwards in time
+        durations = [abs(s.duration_minutes) for s in sessions]
+        return self.analyze_focus_stats({
+            'activity_count': len(activities),
+            'avg_attention': (
+                sum(act.focus_indicators.attention_level for act in activities) / len(activities)
+                if activities else 0
+            ),
+            'organized_count': sum(
+                1 for act in activities if act.focus_indicators.workspace_organization == 'organized'
+            ),
+            'high_switch_count': sum(s.context_switches for s in sessions),
+            'session_count': len(sessions),
+            'max_session_minutes': max(durations) if durations else 0,
+            'total_session_minutes': sum(durations),
+            'common_triggers': self._analyze_session_triggers(sessions)
+        })
+
+    def analyze_focus_stats(self, stats: Dict) -> Dict:
+        """Analyze focus patterns from pre-aggregated activity statistics
+
+        ``stats`` carries the counts ``analyze_focus_patterns`` derives
+        from individual activities, so callers that can aggregate in the
+        database never need to build the activity list.
+        """
         return {
-            'context_switches': self._detect_context_switches(activities),
-            'focus_quality': self._assess_focus_quality(activities),
-            'task_completion': self._analyze_task_completion(activities),
-            'environment_impact': self._assess_environment(activities),
-            'recommendations': self._generate_recommendations(activities)
-        } 
+            'context_switches': self._detect_context_switches(stats),
+            'focus_quality': self._assess_focus_quality(stats),
+            'task_completion': self._analyze_task_completion(stats),
+            'environment_impact': self._assess_environment(stats),
+            'recommendations': self._generate_recommendations(stats)
+        }
 
-    def _detect_context_switches(self, activities: List[Activity]) -> Dict:
+    def _detect_context_switches(self, stats: Dict) -> Dict:
         """Analyze context switching patterns"""
-        # Group activities into focus sessions
-        sessions = self._group_into_sessions(activities)
+        session_count = stats['session_count']
         
         # Calculate actual metrics
-        switches_per_hour = sum(s.context_switches for s in sessions) / (len(sessions) * 0.25)  # 15min periods
-        max_duration = max(s.duration_minutes for s in sessions) if sessions else 0
-        
-        # Analyze actual triggers
-        triggers = self._analyze_session_triggers(sessions)
+        switches_per_hour = stats['high_switch_count'] / (session_count * 0.25)  # 15min periods
         
         return {
             'switches_per_hour': switches_per_hour,
-            'max_focus_duration': max_duration,
-            'common_triggers': triggers[:3],  # Top 3 most common triggers
-            'session_count': len(sessions),
-            'avg_session_length': sum(s.duration_minutes for s in sessions) / len(sessions) if sessions else 0
+            'max_focus_duration': stats['max_session_minutes'],
+            'common_triggers': stats.get('common_triggers', [])[:3],  # Top 3 most common triggers
+            'session_count': session_count,
+            'avg_session_length': stats['total_session_minutes'] / session_count if session_count else 0
         }
 
     def _group_into_sessions(self, activities: List[Activity]) -> List[FocusSession]:
@@ -226,7 +249,7 @@ class GeminiAnalyzer:
 
     def _analyze_session_triggers(self, sessions: List[FocusSession]) -> List[str]:
         """Analyze what commonly triggers context switches"""
-        trigger_counts = {}
+        trigger_counts = Counter()
         
         for session in sessions:
             if session.start_time and session.end_time:  # Add null check
@@ -235,18 +258,16 @@ class GeminiAnalyzer:
                     if duration > 0:  # Add duration check
                         for trigger in session.triggers:
                             trigger_type = f"{trigger.source}: {trigger.type}"
-                            trigger_counts[trigger_type] = trigger_counts.get(trigger_type, 0) + 1
+                            trigger_counts[trigger_type] += 1
                 except (TypeError, AttributeError):
                     continue  # Skip if we can't calculate duration
         
         # Sort by frequency
-        sorted_triggers = sorted(trigger_counts.items(), key=lambda x: x[1], reverse=True)
-        return [t[0] for t in sorted_triggers]
+        return [trigger for trigger, _ in trigger_counts.most_common()]
 
-    def _assess_focus_quality(self, activities: List[Activity]) -> Dict:
+    def _assess_focus_quality(self, stats: Dict) -> Dict:
         """Assess quality of focus periods"""
-        attention_levels = [act.focus_indicators.attention_level for act in activities]
-        avg_attention = sum(attention_levels) / len(attention_levels) if attention_levels else 0
+        avg_attention = stats['avg_attention']
         
         return {
             'avg_focus_score': avg_attention,
@@ -254,10 +275,10 @@ class GeminiAnalyzer:
             'recovery_activities': ['Documentation review', 'Code organization'] if avg_attention > 50 else ['Short break', 'Task switching']
         }
 
-    def _analyze_task_completion(self, activities: List[Activity]) -> Dict:
+    def _analyze_task_completion(self, stats: Dict) -> Dict:
         """Analyze task completion patterns"""
-        organized_count = sum(1 for act in activities if act.focus_indicators.workspace_organization == 'organized')
-        completion_rate = organized_count / len(activities) if activities else 0
+        activity_count = stats['activity_count']
+        completion_rate = stats['organized_count'] / activity_count if activity_count else 0
         
         return {
             'completion_rate': completion_rate,
@@ -269,10 +290,10 @@ class GeminiAnalyzer:
             }
         }
 
-    def _assess_environment(self, activities: List[Activity]) -> Dict:
+    def _assess_environment(self, stats: Dict) -> Dict:
         """Assess environmental impact on focus"""
-        workspace_states = [act.focus_indicators.workspace_organization for act in activities]
-        organized_ratio = workspace_states.count('organized') / len(workspace_states) if workspace_states else 0
+        activity_count = stats['activity_count']
+        organized_ratio = stats['organized_count'] / activity_count if activity_count else 0
         
         return {
             'workspace_score': organized_ratio * 100,
@@ -283,10 +304,9 @@ class GeminiAnalyzer:
             ]
         }
 
-    def _generate_recommendations(self, activities: List[Activity]) -> List[str]:
+    def _generate_recommendations(self, stats: Dict) -> List[str]:
         """Generate focus improvement recommendations"""
-        attention_levels = [act.focus_indicators.attention_level for act in activities]
-        avg_attention = sum(attention_levels) / len(attention_levels) if attention_levels else 0
+        avg_attention = stats['avg_attention']
         
         recommendations = []
         
@@ -297,7 +317,7 @@ class GeminiAnalyzer:
                 "Set up dedicated workspaces for different tasks"
             ])
         
-        if any(act.focus_indicators.context_switches == 'high' for act in activities):
+        if stats['high_switch_count']:
             recommendations.extend([
                 "Reduce context switching by batching similar tasks",
                 "Use workspace snapshots to maintain task context",
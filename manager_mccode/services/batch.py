@@ -9,6 +9,7 @@ import google.generativeai as genai
 import json
 import os
 from manager_mccode.services.errors import BatchError
+from manager_mccode.services.image import SCREENSHOT_EXTENSIONS, screenshot_mime_type
 
 logger = logging.getLogger(__name__)
 
@@ -270,19 +271,24 @@ class BatchProcessor:
             if not temp_dir.exists():
                 return
                 
-            existing_screenshots = list(temp_dir.glob("*.png"))
+            # One scandir pass, stat'ing each screenshot once for its ctime
+            existing_screenshots = []
+            with os.scandir(temp_dir) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name.startswith("screenshot_") and name.endswith(SCREENSHOT_EXTENSIONS):
+                        existing_screenshots.append((entry.stat().st_ctime, entry.path))
             if not existing_screenshots:
                 return
                 
             logger.info(f"Found {len(existing_screenshots)} existing screenshots to process")
             
             # Sort by creation time
-            existing_screenshots.sort(key=lambda p: p.stat().st_ctime)
+            existing_screenshots.sort()
             
             # Add them to pending queue with their creation timestamps
-            for screenshot in existing_screenshots:
-                creation_time = datetime.fromtimestamp(screenshot.stat().st_ctime)
-                self.pending_screenshots[creation_time] = str(screenshot)
+            for ctime, screenshot in existing_screenshots:
+                self.pending_screenshots[datetime.fromtimestamp(ctime)] = screenshot
             
             # Process immediately
             if self.pending_screenshots:
@@ -331,7 +337,7 @@ class BatchProcessor:
             # Load image
             with open(screenshot_path, 'rb') as img_file:
                 image_part = {
-                    "mime_type": "image/png",
+                    "mime_type": screenshot_mime_type(screenshot_path),
                     "data": img_file.read()
                 }
 
@@ -2,9 +2,14 @@ from datetime import datetime, timedelta
 import sqlite3
 from pathlib import Path
 import logging
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Optional, Tuple, Any, Callable
 import sys
-import json
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from itertools import groupby
+from operator import itemgetter
 from manager_mccode.models.screen_summary import ScreenSummary, Activity, FocusIndicators
 from manager_mccode.config.settings import settings
 from manager_mccode.services.analyzer import GeminiAnalyzer
@@ -14,8 +19,8 @@ import asyncio
 
 logger = logging.getLogger(__name__)
 
-MIGRATIONS = [
-    """
+MIGRATIONS: List[Tuple[str, str]] = [
+    ("initial_schema", """
     -- Core activity tracking
     CREATE TABLE IF NOT EXISTS activity_snapshots (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -87,9 +92,545 @@ MIGRATIONS = [
     CREATE INDEX IF NOT EXISTS idx_focus_states_snapshot ON focus_states(snapshot_id);
     CREATE INDEX IF NOT EXISTS idx_focus_sessions_time ON focus_sessions(start_time);
     CREATE INDEX IF NOT EXISTS idx_environments_snapshot ON environments(snapshot_id);
-    """
+    """),
+    ("snapshot_counter", """
+    -- Row counter maintained by triggers so stats never need COUNT(*)
+    CREATE TABLE IF NOT EXISTS counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    );
+
+    INSERT OR IGNORE INTO counters (name, value)
+    SELECT 'snapshots', COUNT(*) FROM activity_snapshots;
+
+    CREATE TRIGGER IF NOT EXISTS trg_snapshots_count_insert
+    AFTER INSERT ON activity_snapshots
+    BEGIN
+        UPDATE counters SET value = value + 1 WHERE name = 'snapshots';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_snapshots_count_delete
+    AFTER DELETE ON activity_snapshots
+    BEGIN
+        UPDATE counters SET value = value - 1 WHERE name = 'snapshots';
+    END;
+    """),
+    ("task_segments", """
+    -- Task segment tracking
+    CREATE TABLE IF NOT EXISTS task_segments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        start_time TIMESTAMP NOT NULL,
+        end_time TIMESTAMP,
+        task_name TEXT NOT NULL,
+        category TEXT,
+        context TEXT
+    );
+
+    -- Partial index holding only the open segment(s)
+    CREATE INDEX IF NOT EXISTS idx_task_segments_open
+        ON task_segments(end_time) WHERE end_time IS NULL;
+    """),
+    ("focus_trigger_session_index", """
+    -- Child-key index so foreign key checks on focus_sessions deletes
+    -- probe focus_triggers instead of scanning it
+    CREATE INDEX IF NOT EXISTS idx_focus_triggers_session
+        ON focus_triggers(session_id);
+    """),
+    ("epoch_ms_timestamps", """
+    -- Convert legacy local-time ISO text to integer epoch milliseconds.
+    -- The 'utc' modifier treats the stored text as local time, matching
+    -- how naive datetimes were written.
+    UPDATE activity_snapshots
+        SET timestamp = CAST(ROUND((julianday(timestamp, 'utc') - 2440587.5) * 86400000) AS INTEGER)
+        WHERE typeof(timestamp) = 'text';
+    UPDATE task_segments
+        SET start_time = CAST(ROUND((julianday(start_time, 'utc') - 2440587.5) * 86400000) AS INTEGER)
+        WHERE typeof(start_time) = 'text';
+    UPDATE task_segments
+        SET end_time = CAST(ROUND((julianday(end_time, 'utc') - 2440587.5) * 86400000) AS INTEGER)
+        WHERE typeof(end_time) = 'text';
+    UPDATE focus_sessions
+        SET start_time = CAST(ROUND((julianday(start_time, 'utc') - 2440587.5) * 86400000) AS INTEGER)
+        WHERE typeof(start_time) = 'text';
+    UPDATE focus_sessions
+        SET end_time = CAST(ROUND((julianday(end_time, 'utc') - 2440587.5) * 86400000) AS INTEGER)
+        WHERE typeof(end_time) = 'text';
+    UPDATE focus_triggers
+        SET trigger_time = CAST(ROUND((julianday(trigger_time, 'utc') - 2440587.5) * 86400000) AS INTEGER)
+        WHERE typeof(trigger_time) = 'text';
+    """),
+    ("activities_covering_index", """
+    -- Summary reads join activities on snapshot_id and read every column,
+    -- so carry them in the index and skip the table lookup per row. The
+    -- single-column index is a prefix of this one and only costs writes.
+    CREATE INDEX IF NOT EXISTS idx_activities_covering ON activities(
+        snapshot_id, name, category, purpose, attention_level,
+        context_switches, workspace_organization
+    );
+    DROP INDEX IF EXISTS idx_activities_snapshot;
+    """),
+    ("activity_label_codes", """
+    -- Store the two focus-indicator labels as small integer codes (see
+    -- _CONTEXT_SWITCH_LABELS / _ORGANIZATION_LABELS). Labels outside the
+    -- vocabulary become 0, 'unknown'.
+    ALTER TABLE activities ADD COLUMN context_switches_code INTEGER NOT NULL
+        DEFAULT 0 CHECK (context_switches_code BETWEEN 0 AND 7);
+    ALTER TABLE activities ADD COLUMN workspace_organization_code INTEGER NOT NULL
+        DEFAULT 0 CHECK (workspace_organization_code BETWEEN 0 AND 7);
+    UPDATE activities SET
+        context_switches_code = CASE context_switches
+            WHEN 'low' THEN 1 WHEN 'medium' THEN 2 WHEN 'high' THEN 3 ELSE 0 END,
+        workspace_organization_code = CASE workspace_organization
+            WHEN 'organized' THEN 1 WHEN 'mixed' THEN 2 WHEN 'scattered' THEN 3 ELSE 0 END;
+    DROP INDEX IF EXISTS idx_activities_covering;
+    ALTER TABLE activities DROP COLUMN context_switches;
+    ALTER TABLE activities DROP COLUMN workspace_organization;
+    CREATE INDEX IF NOT EXISTS idx_activities_covering ON activities(
+        snapshot_id, name, category, purpose, attention_level,
+        context_switches_code, workspace_organization_code
+    );
+    """),
+    ("clustered_snapshot_children", """
+    -- focus_states and environments are only ever reached through
+    -- snapshot_id and hold one row per snapshot. Keyed on snapshot_id
+    -- WITHOUT ROWID, each row lives in a single b-tree clustered by
+    -- snapshot, with no rowid table plus separate snapshot_id index.
+    CREATE TABLE focus_states_new (
+        snapshot_id INTEGER NOT NULL,
+        state_type VARCHAR(50) NOT NULL,
+        confidence FLOAT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (snapshot_id, state_type),
+        FOREIGN KEY (snapshot_id) REFERENCES activity_snapshots(id) ON DELETE CASCADE
+    ) WITHOUT ROWID;
+    -- Older databases can hold repeated rows for one key. In both tables
+    -- the most recently inserted (highest id) row is the one kept.
+    INSERT INTO focus_states_new (snapshot_id, state_type, confidence, created_at)
+        SELECT snapshot_id, state_type, confidence, created_at FROM focus_states
+        WHERE id IN (SELECT MAX(id) FROM focus_states GROUP BY snapshot_id, state_type);
+    DROP TABLE focus_states;
+    ALTER TABLE focus_states_new RENAME TO focus_states;
+
+    CREATE TABLE environments_new (
+        snapshot_id INTEGER NOT NULL,
+        environment TEXT NOT NULL,
+        PRIMARY KEY (snapshot_id, environment),
+        FOREIGN KEY (snapshot_id) REFERENCES activity_snapshots(id) ON DELETE CASCADE
+    ) WITHOUT ROWID;
+    INSERT INTO environments_new (snapshot_id, environment)
+        SELECT snapshot_id, environment FROM environments
+        WHERE id IN (SELECT MAX(id) FROM environments GROUP BY snapshot_id, environment);
+    DROP TABLE environments;
+    ALTER TABLE environments_new RENAME TO environments;
+    """),
 ]
 
+# Rows the clustered_snapshot_children migration collapses into one per key
+_SQL_COUNT_DUPLICATE_CHILDREN = """
+    SELECT
+        (SELECT COUNT(*) - COUNT(DISTINCT snapshot_id || '|' || state_type) FROM focus_states),
+        (SELECT COUNT(*) - COUNT(DISTINCT snapshot_id || '|' || environment) FROM environments)
+"""
+
+# Write-path statements. Reusing the same string objects keeps each call a
+# hit in sqlite3's per-connection statement cache.
+_SQL_INSERT_SNAPSHOT = """
+    INSERT INTO activity_snapshots (
+        timestamp, summary, window_title,
+        active_app, focus_score
+    ) VALUES (?, ?, ?, ?, ?)
+"""
+
+_SQL_INSERT_BATCH_SNAPSHOT = """
+    INSERT INTO activity_snapshots
+    (timestamp, summary, focus_score)
+    VALUES (?, ?, ?)
+"""
+
+_SQL_INSERT_ACTIVITY = """
+    INSERT INTO activities
+    (snapshot_id, name, category, purpose, attention_level,
+     context_switches_code, workspace_organization_code)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_INSERT_FOCUS_STATE = """
+    INSERT INTO focus_states
+    (snapshot_id, state_type, confidence)
+    VALUES (?, ?, ?)
+"""
+
+_SQL_INSERT_ENVIRONMENT = """
+    INSERT INTO environments
+    (snapshot_id, environment)
+    VALUES (?, ?)
+"""
+
+_SQL_CLOSE_OPEN_SEGMENTS = """
+    UPDATE task_segments
+    SET end_time = ?
+    WHERE end_time IS NULL
+"""
+
+_SQL_INSERT_TASK_SEGMENT = """
+    INSERT INTO task_segments (
+        start_time,
+        end_time,
+        task_name,
+        category
+    ) VALUES (?, NULL, ?, ?)
+"""
+
+_SQL_INSERT_FOCUS_SESSION = """
+    INSERT INTO focus_sessions (
+        start_time,
+        end_time,
+        duration_minutes,
+        activity_type,
+        interruption_count,
+        context_switches,
+        attention_score
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_INSERT_FOCUS_TRIGGER = """
+    INSERT INTO focus_triggers (
+        session_id,
+        trigger_time,
+        trigger_type,
+        trigger_source,
+        recovery_time_seconds
+    ) VALUES (?, ?, ?, ?, ?)
+"""
+
+# Focus score lookup tables: fewer context switches and a tidier
+# workspace score higher. Unrecognised labels count as neutral.
+_CONTEXT_SWITCH_SCORES = {'low': 0.9, 'medium': 0.6, 'high': 0.3}
+_ORGANIZATION_SCORES = {'organized': 0.9, 'mixed': 0.6, 'scattered': 0.3}
+_FOCUS_SCORE_UNKNOWN = 0.5
+_FOCUS_WEIGHT_ATTENTION = 0.5
+_FOCUS_WEIGHT_CONTEXT = 0.3
+_FOCUS_WEIGHT_ORGANIZATION = 0.2
+
+# activities stores these labels as their index in the tuple; anything
+# outside the vocabulary is stored as 0 and read back as 'unknown'
+_CONTEXT_SWITCH_LABELS = ('unknown', 'low', 'medium', 'high')
+_ORGANIZATION_LABELS = ('unknown', 'organized', 'mixed', 'scattered')
+_CONTEXT_SWITCH_CODES = {label: code for code, label in enumerate(_CONTEXT_SWITCH_LABELS)}
+_ORGANIZATION_CODES = {label: code for code, label in enumerate(_ORGANIZATION_LABELS)}
+
+# Read-path statement for the recent-summaries query: one LEFT JOIN
+# driven by idx_snapshots_timestamp, probing idx_activities_covering per
+# snapshot. Rows come back grouped by snapshot for a single pass in Python.
+_SQL_SELECT_SUMMARIES_SINCE = """
+    SELECT
+        s.id,
+        s.timestamp,
+        s.summary,
+        act.name,
+        act.category,
+        act.purpose,
+        act.attention_level,
+        act.context_switches_code,
+        act.workspace_organization_code
+    FROM activity_snapshots s
+    LEFT JOIN activities act ON act.snapshot_id = s.id
+    WHERE s.timestamp >= ?
+    ORDER BY s.timestamp DESC, s.id, act.id
+"""
+
+# Snapshot export for metrics: same LEFT JOIN shape as above, bounded on
+# both ends, with the column defaults the metrics code expects.
+_SQL_SELECT_SNAPSHOTS_BETWEEN = """
+    SELECT
+        s.id,
+        s.timestamp,
+        s.summary,
+        s.window_title,
+        s.active_app,
+        COALESCE(s.focus_score, 0.0) as focus_score,
+        s.batch_id,
+        act.id,
+        act.name,
+        act.category,
+        act.purpose,
+        COALESCE(act.attention_level, 0.0) as attention_level,
+        act.context_switches_code,
+        act.workspace_organization_code
+    FROM activity_snapshots s
+    LEFT JOIN activities act ON act.snapshot_id = s.id
+    WHERE s.timestamp BETWEEN ? AND ?
+    ORDER BY s.timestamp DESC, s.id, act.id
+"""
+
+# Per-snapshot focus state derived from average activity attention
+_SQL_SELECT_FOCUS_STATES_BETWEEN = """
+    SELECT
+        s.id,
+        CASE
+            WHEN AVG(a.attention_level) >= 70 THEN 'focused'
+            WHEN AVG(a.attention_level) <= 45 THEN 'scattered'
+            ELSE 'neutral'
+        END as state_type,
+        AVG(a.attention_level) as confidence
+    FROM activity_snapshots s
+    LEFT JOIN activities a ON s.id = a.snapshot_id
+    WHERE s.timestamp BETWEEN ? AND ?
+    GROUP BY s.id
+"""
+
+# Distributions for MetricsCollector, counted in SQL so only one row per
+# category/state comes back instead of one per activity/snapshot
+_SQL_COUNT_CATEGORIES_BETWEEN = """
+    SELECT a.category, COUNT(*)
+    FROM activity_snapshots s
+    CROSS JOIN activities a ON a.snapshot_id = s.id
+    WHERE s.timestamp BETWEEN ? AND ?
+    GROUP BY a.category
+"""
+
+_SQL_COUNT_FOCUS_STATES_BETWEEN = f"""
+    SELECT state_type, COUNT(*)
+    FROM ({_SQL_SELECT_FOCUS_STATES_BETWEEN})
+    GROUP BY state_type
+"""
+
+# Per-hour-of-day snapshot totals for MetricsCollector. Hours are local
+# time, matching datetime.fromtimestamp on the Python side.
+_SQL_HOURLY_PATTERNS_BETWEEN = """
+    SELECT
+        CAST(strftime('%H', s.timestamp / 1000, 'unixepoch', 'localtime') AS INTEGER) AS hour,
+        COUNT(*) AS snapshot_count,
+        AVG(COALESCE(s.focus_score, 0.0)) AS avg_focus_score,
+        SUM((SELECT COUNT(*) FROM activities a WHERE a.snapshot_id = s.id)) AS activity_count
+    FROM activity_snapshots s
+    WHERE s.timestamp BETWEEN ? AND ?
+    GROUP BY hour
+"""
+
+# 15-minute buckets for the terminal display. Bucketing is integer
+# division of the epoch-millisecond timestamp; the snapshot side of each
+# join is driven through idx_snapshots_timestamp.
+_BUCKET_MS = 15 * 60 * 1000
+
+# Only the newest few summaries per bucket are concatenated so a busy
+# window can't produce an unbounded string; snapshot_count is still exact.
+_MAX_SUMMARIES_PER_BUCKET = 5
+
+_SQL_BUCKET_SNAPSHOTS = f"""
+    SELECT
+        bucket,
+        COUNT(*) AS snapshot_count,
+        GROUP_CONCAT(
+            CASE WHEN rn <= {_MAX_SUMMARIES_PER_BUCKET} THEN summary END, ' | '
+        ) AS combined_summaries
+    FROM (
+        SELECT
+            timestamp / {_BUCKET_MS} AS bucket,
+            summary,
+            ROW_NUMBER() OVER (
+                PARTITION BY timestamp / {_BUCKET_MS}
+                ORDER BY timestamp DESC
+            ) AS rn
+        FROM activity_snapshots
+        WHERE timestamp >= ?
+    )
+    GROUP BY bucket
+    ORDER BY bucket
+"""
+
+_SQL_BUCKET_ACTIVITIES = f"""
+    SELECT
+        a.timestamp / {_BUCKET_MS} AS bucket,
+        act.snapshot_id,
+        act.name,
+        act.category,
+        act.purpose,
+        act.attention_level,
+        act.context_switches_code,
+        act.workspace_organization_code
+    FROM activity_snapshots a
+    CROSS JOIN activities act ON act.snapshot_id = a.id
+    WHERE a.timestamp >= ?
+    ORDER BY a.timestamp, act.id
+"""
+
+# Attention states are counted per bucket, most frequent first, so the
+# primary state is simply the first row of each bucket
+_SQL_BUCKET_FOCUS_STATES = f"""
+    SELECT a.timestamp / {_BUCKET_MS} AS bucket, f.state_type, COUNT(*) AS state_count
+    FROM activity_snapshots a
+    CROSS JOIN focus_states f ON f.snapshot_id = a.id
+    WHERE a.timestamp >= ?
+    GROUP BY bucket, f.state_type
+    ORDER BY bucket, state_count DESC
+"""
+
+_SQL_BUCKET_ENVIRONMENTS = f"""
+    SELECT a.timestamp / {_BUCKET_MS} AS bucket, e.environment
+    FROM activity_snapshots a
+    CROSS JOIN environments e ON e.snapshot_id = a.id
+    WHERE a.timestamp >= ?
+"""
+
+_SQL_SESSION_STATS = f"""
+    SELECT
+        COUNT(DISTINCT a.id) AS snapshot_count,
+        COUNT(DISTINCT a.timestamp / {_BUCKET_MS}) AS bucket_count,
+        COUNT(f.snapshot_id) AS state_count,
+        COALESCE(SUM(f.state_type = 'focused'), 0) AS focused_count
+    FROM activity_snapshots a
+    LEFT JOIN focus_states f ON f.snapshot_id = a.id
+    WHERE a.timestamp >= ?
+"""
+
+# Focus metrics aggregated in SQL. Mirrors GeminiAnalyzer's session
+# grouping: walking activities newest first, a new session starts when
+# the activity name changes or context switching is 'high' (code 3).
+# A session lasts from its oldest to its newest snapshot.
+_SQL_FOCUS_STATS = """
+    WITH recent AS (
+        SELECT
+            a.name,
+            a.attention_level,
+            a.context_switches_code,
+            a.workspace_organization_code,
+            s.timestamp,
+            ROW_NUMBER() OVER walk AS seq,
+            LAG(a.name) OVER walk AS previous_name
+        FROM activity_snapshots s
+        JOIN activities a ON s.id = a.snapshot_id
+        WHERE s.timestamp >= ?
+        WINDOW walk AS (ORDER BY s.timestamp DESC, a.id)
+    ),
+    marked AS (
+        SELECT
+            *,
+            SUM(
+                CASE WHEN seq = 1
+                       OR name IS NOT previous_name
+                       OR context_switches_code = 3
+                     THEN 1 ELSE 0 END
+            ) OVER (ORDER BY seq) AS session_no
+        FROM recent
+    ),
+    sessions AS (
+        SELECT
+            COUNT(*) AS activity_count,
+            SUM(attention_level) AS attention_total,
+            SUM(workspace_organization_code = 1) AS organized_count,
+            SUM(context_switches_code = 3) AS high_switch_count,
+            CAST((MAX(timestamp) - MIN(timestamp)) / 60000.0 AS INTEGER) AS minutes
+        FROM marked
+        GROUP BY session_no
+    )
+    SELECT
+        COALESCE(SUM(activity_count), 0),
+        SUM(attention_total) / SUM(activity_count),
+        SUM(organized_count),
+        SUM(high_switch_count),
+        COUNT(*),
+        MAX(minutes),
+        SUM(minutes)
+    FROM sessions
+"""
+
+# Retention cleanup deletes this many snapshots per transaction
+_CLEANUP_CHUNK_ROWS = 5000
+
+_SQL_DELETE_SNAPSHOTS_BEFORE = """
+    DELETE FROM activity_snapshots
+    WHERE id IN (
+        SELECT id FROM activity_snapshots
+        WHERE timestamp < ?
+        LIMIT ?
+    )
+"""
+
+# Per-table metadata for get_database_stats. The estimate prefers the
+# whole-table stat row (written when a table has no full index) and
+# otherwise the largest index row count, so partial indexes don't
+# undercount.
+_SQL_TABLE_STATS = """
+    SELECT
+        name,
+        (SELECT COUNT(*) FROM sqlite_master WHERE type='index' AND tbl_name=m.name) as index_count,
+        (SELECT COUNT(*) FROM sqlite_master WHERE type='trigger' AND tbl_name=m.name) as trigger_count,
+        NULL as estimated_rows
+    FROM sqlite_master m
+    WHERE type='table' AND name NOT LIKE 'sqlite_%'
+"""
+
+_SQL_TABLE_STATS_WITH_ESTIMATES = """
+    SELECT
+        name,
+        (SELECT COUNT(*) FROM sqlite_master WHERE type='index' AND tbl_name=m.name) as index_count,
+        (SELECT COUNT(*) FROM sqlite_master WHERE type='trigger' AND tbl_name=m.name) as trigger_count,
+        (SELECT CAST(s.stat AS INTEGER) FROM sqlite_stat1 s
+            WHERE s.tbl = m.name
+            ORDER BY s.idx IS NOT NULL, CAST(s.stat AS INTEGER) DESC
+            LIMIT 1) as estimated_rows
+    FROM sqlite_master m
+    WHERE type='table' AND name NOT LIKE 'sqlite_%'
+"""
+
+_SQL_SNAPSHOT_SUMMARY_STATS = """
+    SELECT
+        (SELECT MIN(timestamp) FROM activity_snapshots),
+        (SELECT MAX(timestamp) FROM activity_snapshots),
+        (SELECT value FROM counters WHERE name = 'snapshots'),
+        (SELECT page_count FROM pragma_page_count()),
+        (SELECT page_size FROM pragma_page_size())
+"""
+
+# Per-connection prepared statement cache size (sqlite3 defaults to 128)
+_STATEMENT_CACHE_SIZE = 512
+
+# How long a connection waits on a locked database before SQLITE_BUSY
+_BUSY_TIMEOUT_SECONDS = 5.0
+
+# Read-only connections kept open for concurrent readers (file DBs only)
+_READ_POOL_SIZE = 4
+
+# Most queued writes the writer thread drains at once; consecutive
+# summaries among them share one transaction
+_WRITER_MAX_BATCH = 64
+
+# Queue sentinel telling the writer thread to flush and exit
+_WRITER_STOP = object()
+
+# Most problems verify_database_integrity collects for the error log
+_INTEGRITY_ERROR_LIMIT = 100
+
+# Free-page fraction above which maintenance() rewrites the file with a
+# full VACUUM instead of an incremental one
+_FULL_VACUUM_FREE_RATIO = 0.5
+
+def _adapt_datetime(value: datetime) -> int:
+    """Store datetimes as integer epoch milliseconds"""
+    return int(value.timestamp()) * 1000 + value.microsecond // 1000
+
+
+def _timestamp_from_db(value: Any) -> datetime:
+    """Build a local naive datetime from epoch milliseconds or legacy ISO text"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    millis = int(value)
+    return datetime.fromtimestamp(millis // 1000).replace(microsecond=(millis % 1000) * 1000)
+
+
+def _convert_timestamp(value: bytes) -> datetime:
+    """Converter for columns declared TIMESTAMP"""
+    return _timestamp_from_db(int(value) if value.isdigit() else value.decode())
+
+
+# Timestamps are compared and indexed as integers rather than ISO text.
+# DEFAULT CURRENT_TIMESTAMP columns still hold text, which the converter
+# also accepts.
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_converter("TIMESTAMP", _convert_timestamp)
+
+
 class DatabaseConnectionError(DatabaseError):
     """Exception raised when database connection fails"""
     pass
@@ -100,29 +641,73 @@ class QueryError(DatabaseError):
 
 class DatabaseManager:
     def __init__(self, db_path=None):
-        """Initialize database manager"""
+        """Initialize database manager
+        
+        Opens one long-lived writer connection (``self.conn``) and, for
+        file-backed databases, a small pool of read-only connections so
+        reads run concurrently and never queue behind a write
+        transaction under WAL. Summaries, snapshots and retention cleanup
+        are written by a background thread; see ``enqueue_summary``.
+        """
         self.db_path = db_path or "manager_mccode.db"
         logger.info(f"Initialized DatabaseManager with db_path: {self.db_path}")
+        self._write_lock = threading.RLock()
+        self._read_pool: Optional[queue.LifoQueue] = None
+        self._local = threading.local()
+        self._thread_conns: List[sqlite3.Connection] = []
+        self._initialized = False
+        self.conn = self._open_connection()
         self.initialize()
+        if self.db_path != ":memory:":
+            self._read_pool = queue.LifoQueue()
+            for _ in range(_READ_POOL_SIZE):
+                self._read_pool.put(self._open_reader())
+        self._write_queue: queue.Queue = queue.Queue()
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop, name="db-writer", daemon=True
+        )
+        self._writer_thread.start()
 
     def initialize(self):
-        """Initialize database schema"""
+        """Initialize database schema
+
+        Safe to call repeatedly; migrations are only checked once per
+        connection since nothing else applies them.
+        """
         try:
-            conn = self.get_connection()
-            try:
-                for migration in MIGRATIONS:
-                    conn.executescript(migration)
+            with self._write_connection() as conn:
+                if self._initialized:
+                    return
+                self._run_migrations(conn)
                 conn.commit()
+                # Analyze only what has never been analyzed or drifted a lot
+                conn.execute("PRAGMA optimize = 0x10002")
+                self._initialized = True
                 logger.info("Database initialization complete")
-            finally:
-                conn.close()
         except Exception as e:
             logger.error(f"Failed to initialize database: {e}")
             raise DatabaseError(f"Failed to initialize database: {e}")
 
-    def get_connection(self):
-        """Get a thread-local database connection"""
-        # Create new connection for each thread
+    def get_connection(self) -> sqlite3.Connection:
+        """Get the calling thread's cached read-write connection
+
+        Opened on first use in each thread and kept until close(), so
+        repeat callers keep SQLite's page cache and skip the open/PRAGMA
+        setup. Callers must not close it. In-memory databases return the
+        writer, since any other connection would see an empty database.
+        """
+        if self.db_path == ":memory:":
+            return self.conn
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+            with self._write_lock:
+                self._thread_conns.append(conn)
+        return conn
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a read-write connection with the standard PRAGMAs applied"""
         if self.db_path != ":memory:":
             db_path = Path(self.db_path)
             db_path.parent.mkdir(parents=True, exist_ok=True)
@@ -130,66 +715,155 @@ class DatabaseManager:
         else:
             db_path_str = self.db_path
 
-        conn = sqlite3.connect(db_path_str)
+        # Shared between worker threads; access is serialized by _write_lock.
+        # isolation_level=None leaves transactions to explicit BEGIN
+        # IMMEDIATE statements instead of sqlite3's implicit deferred BEGIN.
+        conn = sqlite3.connect(
+            db_path_str,
+            isolation_level=None,
+            timeout=_BUSY_TIMEOUT_SECONDS,
+            check_same_thread=False,
+            cached_statements=_STATEMENT_CACHE_SIZE,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+        )
         conn.execute("PRAGMA foreign_keys = ON")
+        # Only takes effect on a new database (or after a VACUUM)
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
         if self.db_path != ":memory:":
             conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(f"PRAGMA wal_autocheckpoint = {int(settings.DB_WAL_AUTOCHECKPOINT_PAGES)}")
+            conn.execute(f"PRAGMA journal_size_limit = {int(settings.DB_JOURNAL_SIZE_LIMIT_MB) * 1024 * 1024}")
         conn.execute("PRAGMA synchronous = NORMAL")
+        self._apply_cache_pragmas(conn)
+        return conn
+
+    def _open_reader(self) -> sqlite3.Connection:
+        """Open a read-only connection to a file-backed database"""
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            timeout=_BUSY_TIMEOUT_SECONDS,
+            check_same_thread=False,
+            cached_statements=_STATEMENT_CACHE_SIZE,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+        )
+        self._apply_cache_pragmas(conn)
         return conn
 
+    def _apply_cache_pragmas(self, conn: sqlite3.Connection) -> None:
+        """Keep hot pages and temp B-trees (sorts, GROUP BY) in RAM"""
+        conn.execute("PRAGMA temp_store = MEMORY")
+        # Lets sorts too big for one pass merge their runs in parallel;
+        # capped by SQLITE_MAX_WORKER_THREADS in the linked library
+        conn.execute(f"PRAGMA threads = {int(settings.DB_SORTER_THREADS)}")
+        # An in-memory database is already all cache
+        if self.db_path != ":memory:":
+            # Negative cache_size is in KiB rather than pages
+            conn.execute(f"PRAGMA cache_size = -{int(settings.DB_CACHE_SIZE_MB) * 1024}")
+            # Reads through the mapping skip the pread() copy into the page cache
+            conn.execute(f"PRAGMA mmap_size = {int(settings.DB_MMAP_SIZE_MB) * 1024 * 1024}")
+
+    def _close_read_pool(self) -> None:
+        """Close pooled readers, waiting briefly for borrowed ones to return"""
+        pool, self._read_pool = self._read_pool, None
+        for _ in range(_READ_POOL_SIZE):
+            try:
+                pool.get(timeout=_BUSY_TIMEOUT_SECONDS).close()
+            except queue.Empty:
+                logger.warning("Read connection still in use at close")
+                break
+
+    @contextmanager
+    def _write_connection(self):
+        """Yield the writer connection while holding the write lock"""
+        with self._write_lock:
+            yield self.conn
+
+    @contextmanager
+    def _read_connection(self):
+        """Yield a connection for read-only queries
+        
+        In-memory databases only exist on the writer connection, so reads
+        share it under the write lock; otherwise a read-only connection is
+        borrowed from the pool (most recently returned first, so its page
+        cache is warm) and never waits on writers.
+        """
+        if self._read_pool is None:
+            with self._write_lock:
+                yield self.conn
+        else:
+            conn = self._read_pool.get()
+            try:
+                yield conn
+            finally:
+                self._read_pool.put(conn)
+
     async def cleanup_old_data(self, days: Optional[int] = None) -> Tuple[int, int]:
         """Clean up old data from the database"""
         try:
             retention_days = days or settings.DATA_RETENTION_DAYS
             cutoff_date = datetime.now() - timedelta(days=retention_days)
             
-            # Run all database operations in a thread
-            return await asyncio.to_thread(self._do_cleanup_with_connection, cutoff_date)
+            # Runs on the writer thread, in order with queued summaries
+            return await asyncio.wrap_future(
+                self._submit_write(lambda conn: self._do_cleanup(conn, cutoff_date))
+            )
         except Exception as e:
             logger.error(f"Failed to clean up old data: {e}")
             raise DatabaseError(f"Data cleanup failed: {e}")
 
-    def _do_cleanup_with_connection(self, cutoff_date: datetime) -> Tuple[int, int]:
-        """Run cleanup with a fresh connection in the worker thread"""
-        conn = self.get_connection()
-        try:
-            return self._do_cleanup(conn, cutoff_date)
-        finally:
-            conn.close()
-
     def _do_cleanup(self, conn: sqlite3.Connection, cutoff_date: datetime) -> Tuple[int, int]:
-        """Internal method to perform the actual cleanup"""
+        """Internal method to perform the actual cleanup
+
+        Deletes in chunks of ``_CLEANUP_CHUNK_ROWS`` snapshots, each its
+        own transaction followed by a WAL checkpoint, so a large backlog
+        never builds one huge WAL. Chunks committed before an error stay
+        deleted.
+        """
         try:
-            conn.execute("BEGIN TRANSACTION")
-            
             # Get initial size
-            initial_size = 0
-            if self.db_path != ":memory:":
-                initial_size = Path(self.db_path).stat().st_size
+            initial_size = self._used_bytes(conn)
 
-            # Delete old records
-            cursor = conn.execute("""
-                DELETE FROM activity_snapshots 
-                WHERE timestamp < ?
-            """, [cutoff_date])
-            deleted = cursor.rowcount
+            # Delete old records; cascades take their children with them
+            deleted = 0
+            while True:
+                conn.execute("BEGIN IMMEDIATE")
+                cursor = conn.execute(_SQL_DELETE_SNAPSHOTS_BEFORE, [cutoff_date, _CLEANUP_CHUNK_ROWS])
+                conn.commit()
+                deleted += cursor.rowcount
+                if cursor.rowcount < _CLEANUP_CHUNK_ROWS:
+                    break
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
 
-            conn.commit()
+            # Return freed pages to the filesystem without a full VACUUM.
+            # execute() steps the pragma once, which frees a single page;
+            # executescript() runs it to completion.
+            conn.executescript("PRAGMA incremental_vacuum;")
 
             # Get final size
-            final_size = 0
-            if self.db_path != ":memory:":
-                final_size = Path(self.db_path).stat().st_size
-                space_reclaimed = initial_size - final_size
-            else:
-                space_reclaimed = 0
+            space_reclaimed = initial_size - self._used_bytes(conn)
 
             return deleted, space_reclaimed
 
         except Exception as e:
-            conn.rollback()
+            if conn.in_transaction:
+                conn.rollback()
             raise e
 
+    @staticmethod
+    def _used_bytes(conn: sqlite3.Connection) -> int:
+        """Bytes held by live pages, excluding the freelist
+
+        Measured from the page counters rather than the file size so it
+        also works for in-memory databases and reflects deletes before a
+        VACUUM shrinks the file.
+        """
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return (page_count - freelist_count) * page_size
+
     async def cleanup(self) -> None:
         """Cleanup database resources during shutdown"""
         try:
@@ -197,98 +871,127 @@ class DatabaseManager:
             await self.cleanup_old_data()
             
             # Run optimizations in a thread
-            await asyncio.to_thread(self._optimize_database_with_connection)
+            await asyncio.to_thread(self._run_pragma_optimize_with_connection)
                 
             logger.info("Database cleanup complete")
         except Exception as e:
             logger.error(f"Error during database cleanup: {e}")
             raise DatabaseError(f"Cleanup failed: {e}")
 
-    def _optimize_database_with_connection(self) -> None:
-        """Run optimizations with a fresh connection"""
-        conn = self.get_connection()
-        try:
-            self._optimize_database(conn)
-        finally:
-            conn.close()
+    def _run_pragma_optimize_with_connection(self) -> None:
+        """Run PRAGMA optimize on the writer connection"""
+        with self._write_connection() as conn:
+            self._run_pragma_optimize(conn)
+
+    def _run_pragma_optimize(self, conn: sqlite3.Connection) -> None:
+        """Refresh planner statistics for tables whose contents changed
 
-    def _optimize_database(self, conn: sqlite3.Connection) -> None:
-        """Run database optimizations"""
+        Cheap enough for every shutdown; analysis_limit bounds how many
+        rows ANALYZE samples per index.
+        """
         try:
-            logger.info("Running database optimizations...")
-            
-            # Skip VACUUM for in-memory databases
-            if self.db_path != ":memory:":
-                conn.execute("PRAGMA optimize")
-                conn.execute("ANALYZE")
-                conn.execute("VACUUM")
-            else:
-                # Just run basic optimizations for in-memory
-                conn.execute("PRAGMA optimize")
-                conn.execute("ANALYZE")
-            
-            logger.info("Database optimizations complete")
+            conn.execute("PRAGMA analysis_limit = 400")
+            conn.execute("PRAGMA optimize")
         except Exception as e:
             logger.error(f"Failed to optimize database: {e}")
             raise DatabaseError(f"Optimization failed: {e}")
 
+    def maintenance(self) -> None:
+        """ANALYZE, then reclaim free pages
+
+        Free pages are released with an incremental vacuum, which costs
+        O(freed pages). A full VACUUM rewrites the whole file and only runs
+        when most of it is free space, or when the file predates
+        auto_vacuum=INCREMENTAL and needs one rewrite to switch over.
+        """
+        try:
+            logger.info("Running database maintenance...")
+            with self._write_connection() as conn:
+                conn.execute("ANALYZE")
+                # Skip VACUUM for in-memory databases
+                if self.db_path != ":memory:":
+                    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+                    freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                    free_ratio = freelist_count / page_count if page_count else 0.0
+                    incremental = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+                    if not incremental or free_ratio > _FULL_VACUUM_FREE_RATIO:
+                        logger.info(
+                            f"Running full VACUUM ({free_ratio:.0%} free, "
+                            f"incremental={incremental})"
+                        )
+                        conn.execute("VACUUM")
+                    elif freelist_count:
+                        logger.info(f"Running incremental vacuum ({freelist_count} free pages)")
+                        conn.executescript("PRAGMA incremental_vacuum;")
+            logger.info("Database maintenance complete")
+        except Exception as e:
+            logger.error(f"Database maintenance failed: {e}")
+            raise DatabaseError(f"Maintenance failed: {e}")
+
     def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
         try:
-            conn = self.get_connection()
-            try:
+            with self._read_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Get table statistics
-                cursor.execute("""
-                    SELECT
-                        name,
-                        (SELECT COUNT(*) FROM sqlite_master WHERE type='index' AND tbl_name=m.name) as index_count,
-                        (SELECT COUNT(*) FROM sqlite_master WHERE type='trigger' AND tbl_name=m.name) as trigger_count
-                    FROM sqlite_master m
-                    WHERE type='table' AND name NOT LIKE 'sqlite_%'
-                """)
+                # Get table statistics. Row counts come from the planner's
+                # sqlite_stat1 estimates (kept fresh by PRAGMA optimize) so
+                # large tables aren't scanned; only tables with no stats yet
+                # fall back to COUNT(*).
+                has_stat1 = cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sqlite_stat1'"
+                ).fetchone() is not None
+                cursor.execute(
+                    _SQL_TABLE_STATS_WITH_ESTIMATES if has_stat1 else _SQL_TABLE_STATS
+                )
+                
+                table_rows = cursor.fetchall()
+                
+                # Tables without estimates are counted in one UNION ALL
+                # round-trip rather than one query per table
+                unestimated = [row[0] for row in table_rows if row[3] is None]
+                exact_counts = {}
+                if unestimated:
+                    exact_counts = dict(cursor.execute(" UNION ALL ".join(
+                        f"SELECT '{name}', COUNT(*) FROM \"{name}\"" for name in unestimated
+                    )).fetchall())
                 
                 tables = {}
-                for table_name, index_count, trigger_count in cursor.fetchall():
-                    # Get row count for each table
-                    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                    row_count = cursor.fetchone()[0]
-                    
+                for table_name, index_count, trigger_count, estimated_rows in table_rows:
                     tables[table_name] = {
-                        "row_count": row_count,
+                        "row_count": (
+                            estimated_rows if estimated_rows is not None
+                            else exact_counts[table_name]
+                        ),
                         "index_count": index_count,
                         "trigger_count": trigger_count
                     }
                 
-                # Get time range info from activity_snapshots
-                cursor.execute("""
-                    SELECT
-                        MIN(timestamp) as oldest,
-                        MAX(timestamp) as newest,
-                        COUNT(*) as total
-                    FROM activity_snapshots
-                """)
+                # Time range, counter total and page counts in one statement.
+                # MIN and MAX stay separate subqueries so each is a single
+                # probe of the timestamp index; the total comes from the
+                # trigger-maintained counter.
+                oldest, newest, total, page_count, page_size = cursor.execute(
+                    _SQL_SNAPSHOT_SUMMARY_STATS
+                ).fetchone()
+                if total is None:
+                    total = cursor.execute(
+                        "SELECT COUNT(*) FROM activity_snapshots"
+                    ).fetchone()[0]
                 
-                time_range = cursor.fetchone()
-                
-                # Handle in-memory database size
-                if self.db_path == ":memory:":
-                    db_size = 0
-                else:
-                    db_size = Path(self.db_path).stat().st_size / (1024 * 1024)
+                # Size from the page counters; no filesystem stat, and it
+                # works for in-memory databases too
+                db_size = page_count * page_size / (1024 * 1024)
                 
                 return {
                     "tables": tables,
                     "database_size_mb": db_size,
                     "time_range": {
-                        "oldest": time_range[0] if time_range[0] else None,
-                        "newest": time_range[1] if time_range[1] else None,
-                        "total_records": time_range[2]
+                        "oldest": _timestamp_from_db(oldest) if oldest is not None else None,
+                        "newest": _timestamp_from_db(newest) if newest is not None else None,
+                        "total_records": total
                     }
                 }
-            finally:
-                conn.close()
                 
         except Exception as e:
             logger.error(f"Failed to get database stats: {e}")
@@ -304,17 +1007,22 @@ class DatabaseManager:
             DatabaseError: If integrity check fails
         """
         try:
-            cursor = self.conn.execute("PRAGMA integrity_check")
-            result = cursor.fetchone()[0]
-            
-            if result != "ok":
-                logger.error(f"Database integrity check failed: {result}")
-                return False
-                
-            cursor = self.conn.execute("PRAGMA foreign_key_check")
-            if cursor.fetchone() is not None:
-                logger.error("Foreign key violations found")
-                return False
+            with self._read_connection() as conn:
+                # quick_check skips the index-vs-table cross-check, which is
+                # most of integrity_check's cost; the full check only runs
+                # to report details once something is already wrong
+                result = conn.execute("PRAGMA quick_check(1)").fetchone()[0]
+                if result != "ok":
+                    problems = [
+                        row[0] for row in
+                        conn.execute(f"PRAGMA integrity_check({_INTEGRITY_ERROR_LIMIT})")
+                    ]
+                    logger.error(f"Database integrity check failed: {problems}")
+                    return False
+                    
+                if conn.execute("PRAGMA foreign_key_check").fetchone() is not None:
+                    logger.error("Foreign key violations found")
+                    return False
                 
             return True
             
@@ -322,47 +1030,55 @@ class DatabaseManager:
             logger.error(f"Failed to verify database integrity: {e}")
             raise DatabaseError(f"Integrity check failed: {e}")
 
-    def _run_migrations(self):
+    def _run_migrations(self, conn: sqlite3.Connection) -> None:
         """Run any pending database migrations"""
         try:
             # Create migrations table first
-            self.conn.execute("""
+            conn.execute("""
                 CREATE TABLE IF NOT EXISTS migrations (
                     name VARCHAR PRIMARY KEY,
                     applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
             
-            # Then run each migration in order
-            for migration in MIGRATIONS:
-                # Extract migration name from comment
-                migration_name = migration.split('\n')[1].strip('- ')
-                
-                # Check if migration has been run
-                cursor = self.conn.execute("""
-                    SELECT COUNT(*) 
-                    FROM migrations 
-                    WHERE name = ?
-                """, [migration_name])
-                result = cursor.fetchone()
-                
-                if result[0] == 0:
-                    logger.info(f"Running migration: {migration_name}")
-                    try:
-                        # Execute migration
-                        self.conn.executescript(migration)
-                        
-                        # Record migration
-                        self.conn.execute(
-                            "INSERT INTO migrations (name) VALUES (?)",
-                            [migration_name]
-                        )
-                        
-                        logger.info(f"Successfully applied migration: {migration_name}")
-                        
-                    except Exception as e:
-                        logger.error(f"Failed to apply migration {migration_name}: {e}")
-                        raise e
+            # Load applied migration names in a single query
+            applied = {row[0] for row in conn.execute("SELECT name FROM migrations")}
+            
+            pending = [(name, sql) for name, sql in MIGRATIONS if name not in applied]
+            if not pending:
+                return
+            
+            # A fresh database has no child rows yet, so only upgrades report
+            if "initial_schema" in applied and "clustered_snapshot_children" not in applied:
+                focus_dupes, environment_dupes = conn.execute(
+                    _SQL_COUNT_DUPLICATE_CHILDREN
+                ).fetchone()
+                if focus_dupes or environment_dupes:
+                    logger.warning(
+                        f"clustered_snapshot_children drops {focus_dupes} duplicate focus_states "
+                        f"and {environment_dupes} duplicate environments rows, keeping the newest of each"
+                    )
+            
+            # executescript() commits before it runs, so the transaction has
+            # to live inside the script for the DDL block to be atomic
+            script = ["BEGIN EXCLUSIVE;"]
+            for migration_name, migration_sql in pending:
+                logger.info(f"Running migration: {migration_name}")
+                script.append(migration_sql)
+                script.append(
+                    f"INSERT INTO migrations (name) VALUES ('{migration_name}');"
+                )
+            script.append("COMMIT;")
+            
+            try:
+                conn.executescript("\n".join(script))
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                logger.error(f"Failed to apply migrations {[n for n, _ in pending]}: {e}")
+                raise e
+            
+            logger.info(f"Successfully applied {len(pending)} migration(s)")
                         
         except Exception as e:
             logger.error(f"Migration failed: {e}")
@@ -370,151 +1086,212 @@ class DatabaseManager:
 
     def store_snapshot(self, snapshot_data: Dict):
         """Store a new activity snapshot"""
+        params = [
+            snapshot_data['timestamp'],
+            snapshot_data['summary'],
+            snapshot_data.get('window_title'),
+            snapshot_data.get('active_app'),
+            snapshot_data.get('focus_score', 0.0)
+        ]
         try:
-            self.conn.execute("""
-                INSERT INTO activity_snapshots (
-                    timestamp, summary, window_title, 
-                    active_app, focus_score
-                ) VALUES (?, ?, ?, ?, ?)
-            """, [
-                snapshot_data['timestamp'],
-                snapshot_data['summary'],
-                snapshot_data.get('window_title'),
-                snapshot_data.get('active_app'),
-                snapshot_data.get('focus_score', 0.0)
-            ])
-            self.conn.commit()
+            self._submit_write(
+                lambda conn: conn.execute(_SQL_INSERT_SNAPSHOT, params)
+            ).result()
             logger.info("Snapshot stored successfully.")
         except Exception as e:
             logger.error(f"Failed to store snapshot: {e}", exc_info=True)
             raise
 
-    def get_recent_activity(self, hours: int = 1) -> List[Dict]:
-        """Get recent activity with focus states"""
+    def get_recent_activity(self, hours: int = 1) -> List[sqlite3.Row]:
+        """Get recent activity with focus states
+
+        Rows support key access (``row['focus_state']``) as well as
+        positional access; call ``dict(row)`` where a real dict is needed.
+        """
         try:
-            cursor = self.conn.cursor()  # Use existing connection instead of creating new one
-            
             # Debug logging
             logger.debug(f"Getting activity for past {hours} hours")
-            
-            # Simplified query that doesn't rely on relative time
-            cursor.execute("""
-                SELECT
-                    a.timestamp,
-                    a.summary,
-                    f.state_type as focus_state,
-                    f.confidence as focus_confidence,
-                    act.name as activity_name,
-                    act.category,
-                    act.attention_level
-                FROM activity_snapshots a
-                LEFT JOIN focus_states f ON a.id = f.snapshot_id
-                LEFT JOIN activities act ON a.id = act.snapshot_id
-                ORDER BY a.timestamp DESC
-                LIMIT 100
-            """)
-            
-            results = []
-            for row in cursor.fetchall():
-                result = {
-                    'timestamp': row[0],
-                    'summary': row[1],
-                    'focus_state': row[2],
-                    'focus_confidence': row[3],
-                    'activity_name': row[4],
-                    'category': row[5],
-                    'attention_level': row[6]
-                }
-                logger.debug(f"Found activity: {result}")
-                results.append(result)
-            
-            logger.debug(f"Retrieved {len(results)} activities")
-            return results
+
+            with self._read_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
+                # Simplified query that doesn't rely on relative time
+                rows = cursor.execute("""
+                    SELECT
+                        a.timestamp,
+                        a.summary,
+                        f.state_type as focus_state,
+                        f.confidence as focus_confidence,
+                        act.name as activity_name,
+                        act.category,
+                        act.attention_level
+                    FROM activity_snapshots a
+                    LEFT JOIN focus_states f ON a.id = f.snapshot_id
+                    LEFT JOIN activities act ON a.id = act.snapshot_id
+                    ORDER BY a.timestamp DESC
+                    LIMIT 100
+                """).fetchall()
+
+            logger.debug(f"Retrieved {len(rows)} activities")
+            return rows
                 
         except Exception as e:
             logger.error(f"Failed to get recent activity: {e}")
             raise DatabaseError(f"Failed to get recent activity: {e}")
 
     def close(self):
-        """Close database connection"""
+        """Close database connections"""
+        self._stop_writer()
         if self.conn:
             try:
-                self._optimize_database()
-                self.conn.close()
+                with self._write_connection() as conn:
+                    self._run_pragma_optimize(conn)
+                    if self._read_pool is not None:
+                        self._close_read_pool()
+                    for thread_conn in self._thread_conns:
+                        thread_conn.close()
+                    self._thread_conns.clear()
+                    conn.close()
                 logger.info("Database connection closed.")
             except Exception as e:
                 logger.error(f"Error closing database: {e}")
 
     def store_summary(self, summary: ScreenSummary) -> int:
-        """Store a screen summary in the database"""
+        """Store a screen summary in the database and wait for its id"""
+        return self.enqueue_summary(summary).result()
+
+    def enqueue_summary(self, summary: ScreenSummary) -> "Future[int]":
+        """Queue a summary for the writer thread without waiting on disk
+
+        The returned future resolves to the snapshot id once the batch
+        containing it is committed, or raises the DatabaseError if the
+        write failed.
+        """
+        if not self._writer_thread.is_alive():
+            raise DatabaseError("Failed to store summary: database writer is stopped")
+        future: "Future[int]" = Future()
+        self._write_queue.put((summary, future))
+        return future
+
+    def _submit_write(self, job: Callable[[sqlite3.Connection], Any]) -> Future:
+        """Queue ``job(conn)`` to run on the writer thread
+
+        The job owns its transaction; the future resolves to its return
+        value. Never wait on the result from the writer thread itself.
+        """
+        if not self._writer_thread.is_alive():
+            raise DatabaseError("Database writer is stopped")
+        future: Future = Future()
+        self._write_queue.put((job, future))
+        return future
+
+    def _writer_loop(self) -> None:
+        """Run queued writes in order, grouping consecutive summaries
+
+        There is no linger timer: summaries that arrive while a commit is
+        in flight simply form the next batch. Other jobs run one at a time
+        between batches.
+        """
+        stopping = False
+        while not stopping:
+            item = self._write_queue.get()
+            batch = []
+            while True:
+                if item is _WRITER_STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= _WRITER_MAX_BATCH:
+                    break
+                try:
+                    item = self._write_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            for is_job, group in groupby(batch, key=lambda entry: callable(entry[0])):
+                group = list(group)
+                try:
+                    if is_job:
+                        for job, future in group:
+                            self._run_write_job(job, future)
+                    else:
+                        self._write_summary_batch(group)
+                except Exception as e:
+                    # Nothing may end this thread, or every later write would hang
+                    logger.error(f"Database writer failed on a queued write: {e}")
+                    for _, future in group:
+                        if not future.done():
+                            future.set_exception(e)
+
+    def _write_summary_batch(self, batch: List[Tuple[ScreenSummary, Future]]) -> None:
+        """Commit queued summaries together and resolve their futures
+
+        If the shared transaction fails, each summary is retried on its own
+        so only the offending caller's future gets the exception. Summaries
+        whose future was cancelled while queued are not written.
+        """
+        batch = [(summary, future) for summary, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        futures = [future for _, future in batch]
         try:
-            cursor = self.conn.cursor()
-            
-            # Start transaction
-            cursor.execute("BEGIN TRANSACTION")
-            
-            try:
-                # Insert main snapshot
-                cursor.execute("""
-                    INSERT INTO activity_snapshots 
-                    (timestamp, summary, focus_score)
-                    VALUES (?, ?, ?)
-                    RETURNING id
-                """, (
-                    summary.timestamp,
-                    summary.summary,
-                    0.0  # Default focus score
-                ))
-                
-                snapshot_id = cursor.fetchone()[0]
-                
-                # Store activities
-                for activity in summary.activities:
-                    cursor.execute("""
-                        INSERT INTO activities 
-                        (snapshot_id, name, category, purpose, attention_level,
-                         context_switches, workspace_organization)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        snapshot_id,
-                        activity.name,
-                        activity.category,
-                        getattr(activity, 'purpose', ''),
-                        activity.focus_indicators.attention_level,
-                        activity.focus_indicators.context_switches,
-                        activity.focus_indicators.workspace_organization
-                    ))
-                
-                # Store focus state if context exists and has required attributes
-                if hasattr(summary, 'context') and summary.context:
-                    cursor.execute("""
-                        INSERT INTO focus_states 
-                        (snapshot_id, state_type, confidence)
-                        VALUES (?, ?, ?)
-                    """, (
-                        snapshot_id,
-                        summary.context.attention_state,
-                        summary.context.confidence
-                    ))
-                
-                cursor.execute("COMMIT")
-                return snapshot_id
-                
-            except Exception as e:
-                cursor.execute("ROLLBACK")
-                raise e
-                
+            snapshot_ids = self.store_summaries([summary for summary, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                futures[0].set_exception(e)
+                return
+            logger.warning(f"Summary batch of {len(batch)} failed, retrying individually")
+            for summary, future in batch:
+                try:
+                    snapshot_id, = self.store_summaries([summary])
+                except Exception as item_error:
+                    future.set_exception(item_error)
+                else:
+                    future.set_result(snapshot_id)
+        else:
+            for future, snapshot_id in zip(futures, snapshot_ids):
+                future.set_result(snapshot_id)
+
+    def _run_write_job(self, job: Callable[[sqlite3.Connection], Any], future: Future) -> None:
+        """Run a queued job on the writer connection and resolve its future
+
+        Jobs whose caller cancelled the future while it was queued are
+        skipped.
+        """
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            with self._write_connection() as conn:
+                result = job(conn)
         except Exception as e:
-            logger.error(f"Failed to store summary: {e}")
-            raise DatabaseError(f"Failed to store summary: {e}")
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    def _stop_writer(self) -> None:
+        """Flush pending writes and stop the writer thread"""
+        if self._writer_thread.is_alive():
+            self._write_queue.put(_WRITER_STOP)
+            self._writer_thread.join()
 
     def _calculate_focus_score(self, summary: ScreenSummary) -> float:
-        """Calculate a focus score from the summary"""
+        """Calculate a 0-100 focus score from the summary's activities"""
         try:
-            if not summary.context:
-                raise DatabaseError("Missing context in summary")
+            activities = summary.activities
+            if not activities:
+                return 0.0
 
-            # Rest of the function...
+            total = 0.0
+            for activity in activities:
+                indicators = activity.focus_indicators
+                attention = min(max(float(indicators.attention_level), 0.0), 100.0) / 100.0
+                total += (
+                    _FOCUS_WEIGHT_ATTENTION * attention
+                    + _FOCUS_WEIGHT_CONTEXT * _CONTEXT_SWITCH_SCORES.get(indicators.context_switches, _FOCUS_SCORE_UNKNOWN)
+                    + _FOCUS_WEIGHT_ORGANIZATION * _ORGANIZATION_SCORES.get(indicators.workspace_organization, _FOCUS_SCORE_UNKNOWN)
+                )
+
+            return round(total / len(activities) * 100.0, 1)
 
         except Exception as e:
             logger.error(f"Error calculating focus score: {e}")
@@ -523,46 +1300,32 @@ class DatabaseManager:
     def _update_task_segments(self, summary: ScreenSummary):
         """Update or create task segments based on the summary"""
         try:
-            # First, close any open segments
-            self.conn.execute("""
-                UPDATE task_segments 
-                SET end_time = ? 
-                WHERE end_time IS NULL
-            """, [summary.timestamp])
-
-            # Create new segment using SQLite's autoincrement
-            self.conn.execute("""
-                INSERT INTO task_segments (
-                    start_time, 
-                    end_time,
-                    task_name, 
-                    category, 
-                    context
-                ) VALUES (?, NULL, ?, ?, ?)
-            """, [
-                summary.timestamp,
-                summary.context.primary_task if summary.context else 'unknown',
-                summary.activities[0].category if summary.activities else 'unknown',
-                json.dumps({
-                    'environment': summary.context.environment if summary.context else {},
-                    'activities': [a.dict() for a in summary.activities] if summary.activities else []
-                })
-            ])
+            with self._write_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # First, close any open segments
+                    conn.execute(_SQL_CLOSE_OPEN_SEGMENTS, [summary.timestamp])
+
+                    # Create new segment using SQLite's autoincrement
+                    conn.execute(_SQL_INSERT_TASK_SEGMENT, [
+                        summary.timestamp,
+                        summary.context.primary_task if summary.context else 'unknown',
+                        summary.activities[0].category if summary.activities else 'unknown'
+                    ])
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
                 
         except Exception as e:
             logger.error(f"Error updating task segments: {str(e)}")
             raise e
 
-    def _get_segment_task(self, segment_id: int) -> str:
-        """Get the task name for a segment"""
-        cursor = self.conn.execute("""
-            SELECT task_name FROM task_segments WHERE id = ?
-        """, [segment_id])
-        result = cursor.fetchone()
-        return result[0] if result else "unknown"  # Return "unknown" instead of None
-
     def _verify_schema(self):
         """Verify database schema is correct"""
+        # Both probes exist only to be logged at debug level
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
         try:
             # SQLite schema query
             cursor = self.conn.execute("""
@@ -585,111 +1348,147 @@ class DatabaseManager:
     def get_recent_summaries(self, hours: int = 24) -> List[ScreenSummary]:
         """Get screen summaries from the last N hours"""
         try:
-            conn = self.get_connection()
-            try:
+            # Calculate cutoff time
+            cutoff = datetime.now() - timedelta(hours=hours)
+            logger.debug(f"Getting summaries since: {cutoff}")
+
+            with self._read_connection() as conn:
                 cursor = conn.cursor()
-                
-                # Calculate cutoff time
-                cutoff = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
-                logger.debug(f"Getting summaries since: {cutoff}")
-                
-                # Get summaries
-                cursor.execute("""
-                    SELECT COUNT(*) FROM activity_snapshots
-                    WHERE timestamp >= ?
-                """, [cutoff])
-                count = cursor.fetchone()[0]
-                logger.debug(f"Found {count} summaries in time range")
-                
-                cursor.execute("""
-                    SELECT * FROM activity_snapshots
-                    WHERE timestamp >= ?
-                    ORDER BY timestamp DESC
-                """, [cutoff])
-                
-                summaries = []
-                for row in cursor.fetchall():
-                    logger.debug(f"Processing snapshot {row[0]} from {row[1]}")
-                    
-                    # Get associated activities
-                    cursor.execute("""
-                        SELECT COUNT(*) FROM activities
-                        WHERE snapshot_id = ?
-                    """, [row[0]])
-                    activity_count = cursor.fetchone()[0]
-                    logger.debug(f"Found {activity_count} activities for snapshot {row[0]}")
-                    
-                    cursor.execute("""
-                        SELECT * FROM activities
-                        WHERE snapshot_id = ?
-                    """, [row[0]])
-                    
-                    activities = []
-                    for activity_row in cursor.fetchall():
-                        activity = Activity(
-                            name=activity_row[2],
-                            category=activity_row[3],
-                            purpose=activity_row[4],
+                cursor.row_factory = sqlite3.Row
+                rows = cursor.execute(_SQL_SELECT_SUMMARIES_SINCE, [cutoff]).fetchall()
+
+            summaries = []
+            for _, group in groupby(rows, key=itemgetter('id')):
+                group = list(group)
+                first = group[0]
+                summaries.append(ScreenSummary(
+                    timestamp=first['timestamp'],
+                    summary=first['summary'],
+                    activities=[
+                        Activity(
+                            name=row['name'],
+                            category=row['category'],
+                            purpose=row['purpose'],
                             focus_indicators=FocusIndicators(
-                                attention_level=activity_row[5],
-                                context_switches=activity_row[6],
-                                workspace_organization=activity_row[7]
+                                attention_level=row['attention_level'],
+                                context_switches=_CONTEXT_SWITCH_LABELS[row['context_switches_code']],
+                                workspace_organization=_ORGANIZATION_LABELS[row['workspace_organization_code']]
                             )
                         )
-                        activities.append(activity)
-                    
-                    summary = ScreenSummary(
-                        timestamp=datetime.fromisoformat(row[1].replace(' ', 'T')),
-                        summary=row[2],
-                        activities=activities
-                    )
-                    summaries.append(summary)
-                
-                logger.info(f"Retrieved {len(summaries)} summaries from database")
-                return summaries
-                
-            finally:
-                conn.close()
-                
+                        # LEFT JOIN yields one all-NULL row for snapshots without activities
+                        for row in group if row['name'] is not None
+                    ]
+                ))
+
+            logger.info(f"Retrieved {len(summaries)} summaries from database")
+            return summaries
+
         except Exception as e:
             logger.error(f"Error getting recent summaries: {e}")
             raise DatabaseError(f"Failed to get recent summaries: {e}")
 
+    def get_recent_fifteen_min_summaries(self, hours: float = 1.0) -> List[Dict]:
+        """Get recent snapshots grouped into 15-minute buckets, oldest first
+
+        Each bucket has the shape TerminalDisplay.show_recent_summaries
+        expects: ``bucket`` (datetime), ``snapshot_count``,
+        ``combined_summaries``, ``all_activities`` (one list of activity
+        dicts per snapshot), ``contexts`` and ``attention_states``, plus
+        ``primary_state``, the bucket's most frequent attention state.
+        """
+        try:
+            cutoff = datetime.now() - timedelta(hours=hours)
+
+            with self._read_connection() as conn:
+                bucket_rows = conn.execute(_SQL_BUCKET_SNAPSHOTS, [cutoff]).fetchall()
+                activity_rows = conn.execute(_SQL_BUCKET_ACTIVITIES, [cutoff]).fetchall()
+                state_rows = conn.execute(_SQL_BUCKET_FOCUS_STATES, [cutoff]).fetchall()
+                environment_rows = conn.execute(_SQL_BUCKET_ENVIRONMENTS, [cutoff]).fetchall()
+
+            buckets: Dict[int, Dict] = {}
+            for bucket, snapshot_count, combined_summaries in bucket_rows:
+                buckets[bucket] = {
+                    'bucket': _timestamp_from_db(bucket * _BUCKET_MS),
+                    'snapshot_count': snapshot_count,
+                    'combined_summaries': combined_summaries or '',
+                    'all_activities': [],
+                    'contexts': [],
+                    'attention_states': [],
+                    'primary_state': None
+                }
+
+            last_snapshot_id = None
+            for (bucket, snapshot_id, name, category, purpose, attention_level,
+                 context_switches_code, workspace_organization_code) in activity_rows:
+                entry = buckets.get(bucket)
+                if entry is None:
+                    continue
+                if snapshot_id != last_snapshot_id:
+                    entry['all_activities'].append([])
+                    last_snapshot_id = snapshot_id
+                entry['all_activities'][-1].append({
+                    'name': name,
+                    'category': category,
+                    'purpose': purpose,
+                    'focus_indicators': {
+                        'attention_level': attention_level,
+                        'context_switches': _CONTEXT_SWITCH_LABELS[context_switches_code],
+                        'workspace_organization': _ORGANIZATION_LABELS[workspace_organization_code]
+                    }
+                })
+
+            for bucket, state_type, state_count in state_rows:
+                entry = buckets.get(bucket)
+                if entry is None:
+                    continue
+                if entry['primary_state'] is None:
+                    entry['primary_state'] = state_type
+                entry['attention_states'].extend([state_type] * state_count)
+
+            for bucket, environment in environment_rows:
+                if bucket in buckets:
+                    buckets[bucket]['contexts'].append({'environment': environment})
+
+            return list(buckets.values())
+
+        except Exception as e:
+            logger.error(f"Failed to get fifteen minute summaries: {e}")
+            raise DatabaseError(f"Failed to get fifteen minute summaries: {e}")
+
+    def get_session_stats(self, hours: float = 1.0) -> Dict:
+        """Get the totals shown under TerminalDisplay.show_recent_summaries
+
+        Covers the same window as get_recent_fifteen_min_summaries, in one
+        aggregate query rather than a walk over the bucket dicts.
+        """
+        try:
+            cutoff = datetime.now() - timedelta(hours=hours)
+
+            with self._read_connection() as conn:
+                snapshot_count, bucket_count, state_count, focused_count = conn.execute(
+                    _SQL_SESSION_STATS, [cutoff]
+                ).fetchone()
+
+            return {
+                'total_snapshots': snapshot_count,
+                'total_minutes': bucket_count * 15,
+                'focus_percentage': (focused_count / state_count * 100) if state_count else 0.0
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to get session stats: {e}")
+            raise DatabaseError(f"Failed to get session stats: {e}")
+
     def get_focus_metrics(self, hours: int = 24) -> Dict:
         """Get focus metrics for the specified time period"""
         try:
-            cursor = self.conn.cursor()
-            
-            # Get activities for analysis
-            cursor.execute("""
-                SELECT
-                    a.name,
-                    a.category,
-                    a.attention_level,
-                    a.context_switches,
-                    a.workspace_organization,
-                    s.timestamp
-                FROM activity_snapshots s
-                JOIN activities a ON s.id = a.snapshot_id
-                WHERE s.timestamp >= datetime('now', ?)
-                ORDER BY s.timestamp DESC
-            """, (f'-{hours} hours',))
+            with self._read_connection() as conn:
+                (activity_count, avg_attention, organized_count, high_switch_count,
+                 session_count, max_session_minutes, total_session_minutes) = conn.execute(
+                    _SQL_FOCUS_STATS, (datetime.now() - timedelta(hours=hours),)
+                ).fetchone()
             
-            activities = [
-                Activity(
-                    name=row[0],
-                    category=row[1],
-                    purpose="",  # Not used for metrics
-                    focus_indicators=FocusIndicators(
-                        attention_level=row[2],
-                        context_switches=row[3],
-                        workspace_organization=row[4]
-                    ),
-                    timestamp=datetime.fromisoformat(row[5].replace(' ', 'T'))  # Add timestamp
-                ) for row in cursor.fetchall()
-            ]
-            
-            if not activities:
+            if not activity_count:
                 return {
                     'switches_per_hour': 0,
                     'max_focus_duration': 0,
@@ -702,7 +1501,15 @@ class DatabaseManager:
                 
             # Use analyzer to get metrics
             analyzer = GeminiAnalyzer()
-            metrics = analyzer.analyze_focus_patterns(activities)
+            metrics = analyzer.analyze_focus_stats({
+                'activity_count': activity_count,
+                'avg_attention': avg_attention,
+                'organized_count': organized_count,
+                'high_switch_count': high_switch_count,
+                'session_count': session_count,
+                'max_session_minutes': max_session_minutes,
+                'total_session_minutes': total_session_minutes
+            })
             
             return metrics
             
@@ -713,70 +1520,37 @@ class DatabaseManager:
     def get_snapshots_between(self, start: datetime, end: datetime) -> List[Dict]:
         """Get snapshots between two timestamps"""
         try:
-            conn = self.get_connection()
-            try:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT 
-                        id,
-                        timestamp,
-                        summary,
-                        window_title,
-                        active_app,
-                        COALESCE(focus_score, 0.0) as focus_score,
-                        batch_id
-                    FROM activity_snapshots 
-                    WHERE timestamp BETWEEN ? AND ?
-                    ORDER BY timestamp DESC
-                """, [start.strftime('%Y-%m-%d %H:%M:%S'), 
-                     end.strftime('%Y-%m-%d %H:%M:%S')])
-                
-                snapshots = []
-                for row in cursor.fetchall():
-                    snapshot = {
-                        "id": row[0],
-                        "timestamp": datetime.fromisoformat(row[1].replace(' ', 'T')),
-                        "summary": row[2],
-                        "window_title": row[3] or "",
-                        "active_app": row[4] or "",
-                        "focus_score": float(row[5]),  # Ensure float
-                        "batch_id": row[6],
-                        "activities": []  # Initialize empty activities list
-                    }
-                    
-                    # Get associated activities
-                    cursor.execute("""
-                        SELECT 
-                            name,
-                            category,
-                            purpose,
-                            COALESCE(attention_level, 0.0) as attention_level,
-                            COALESCE(context_switches, 'low') as context_switches,
-                            COALESCE(workspace_organization, 'neutral') as workspace_organization
-                        FROM activities
-                        WHERE snapshot_id = ?
-                    """, [row[0]])
-                    
-                    activities = []
-                    for activity_row in cursor.fetchall():
-                        activity = {
-                            "name": activity_row[0] or "unknown",
-                            "category": activity_row[1] or "unknown",
-                            "purpose": activity_row[2] or "",
-                            "attention_level": float(activity_row[3]),
-                            "context_switches": activity_row[4],
-                            "workspace_organization": activity_row[5]
+            with self._read_connection() as conn:
+                rows = conn.execute(_SQL_SELECT_SNAPSHOTS_BETWEEN, [start, end]).fetchall()
+
+            snapshots = []
+            for _, group in groupby(rows, key=itemgetter(0)):
+                group = list(group)
+                row = group[0]
+                snapshots.append({
+                    "id": row[0],
+                    "timestamp": row[1],
+                    "summary": row[2],
+                    "window_title": row[3] or "",
+                    "active_app": row[4] or "",
+                    "focus_score": float(row[5]),  # Ensure float
+                    "batch_id": row[6],
+                    "activities": [
+                        {
+                            "name": activity_row[8] or "unknown",
+                            "category": activity_row[9] or "unknown",
+                            "purpose": activity_row[10] or "",
+                            "attention_level": float(activity_row[11]),
+                            "context_switches": _CONTEXT_SWITCH_LABELS[activity_row[12]],
+                            "workspace_organization": _ORGANIZATION_LABELS[activity_row[13]]
                         }
-                        activities.append(activity)
-                    
-                    snapshot["activities"] = activities
-                    snapshots.append(snapshot)
-                
-                return snapshots
-                
-            finally:
-                conn.close()
-                
+                        # LEFT JOIN yields one all-NULL row for snapshots without activities
+                        for activity_row in group if activity_row[7] is not None
+                    ]
+                })
+
+            return snapshots
+
         except Exception as e:
             logger.error(f"Error getting snapshots: {e}")
             return []
@@ -784,24 +1558,31 @@ class DatabaseManager:
     def get_activities_between(self, start: datetime, end: datetime) -> List[Dict]:
         """Get all activities between two timestamps"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT 
-                    a.id,
-                    a.name,
-                    a.category,
-                    a.attention_level,
-                    a.context_switches,
-                    a.workspace_organization
-                FROM activities a
-                JOIN activity_snapshots s ON a.snapshot_id = s.id
-                WHERE s.timestamp BETWEEN ? AND ?
-            """, (start, end))
+            with self._read_connection() as conn:
+                rows = conn.execute("""
+                    SELECT 
+                        a.id,
+                        a.name,
+                        a.category,
+                        a.attention_level,
+                        a.context_switches_code,
+                        a.workspace_organization_code
+                    FROM activities a
+                    JOIN activity_snapshots s ON a.snapshot_id = s.id
+                    WHERE s.timestamp BETWEEN ? AND ?
+                """, (start, end)).fetchall()
             
-            columns = [description[0] for description in cursor.description]
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return [
+                {
+                    "id": row[0],
+                    "name": row[1],
+                    "category": row[2],
+                    "attention_level": row[3],
+                    "context_switches": _CONTEXT_SWITCH_LABELS[row[4]],
+                    "workspace_organization": _ORGANIZATION_LABELS[row[5]]
+                }
+                for row in rows
+            ]
             
         except Exception as e:
             logger.error(f"Error getting activities: {e}")
@@ -810,110 +1591,120 @@ class DatabaseManager:
     def get_focus_states_between(self, start: datetime, end: datetime) -> List[Dict]:
         """Get focus states between two timestamps"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT 
-                    s.id,
-                    CASE 
-                        WHEN AVG(a.attention_level) >= 70 THEN 'focused'
-                        WHEN AVG(a.attention_level) <= 45 THEN 'scattered'
-                        ELSE 'neutral'
-                    END as state_type,
-                    AVG(a.attention_level) as confidence
-                FROM activity_snapshots s
-                LEFT JOIN activities a ON s.id = a.snapshot_id
-                WHERE s.timestamp BETWEEN ? AND ?
-                GROUP BY s.id
-            """, (start, end))
+            with self._read_connection() as conn:
+                rows = conn.execute(_SQL_SELECT_FOCUS_STATES_BETWEEN, (start, end)).fetchall()
             
-            columns = [description[0] for description in cursor.description]
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return [
+                {"id": snapshot_id, "state_type": state_type, "confidence": confidence}
+                for snapshot_id, state_type, confidence in rows
+            ]
             
         except Exception as e:
             logger.error(f"Error getting focus states: {e}")
             raise DatabaseError(f"Failed to get focus states: {e}") 
 
+    def count_activity_categories_between(self, start: datetime, end: datetime) -> Dict[str, int]:
+        """Count activities per category between two timestamps"""
+        try:
+            with self._read_connection() as conn:
+                return dict(conn.execute(_SQL_COUNT_CATEGORIES_BETWEEN, (start, end)).fetchall())
+            
+        except Exception as e:
+            logger.error(f"Error counting activity categories: {e}")
+            raise DatabaseError(f"Failed to count activity categories: {e}")
+
+    def count_focus_states_between(self, start: datetime, end: datetime) -> Dict[str, int]:
+        """Count snapshots per focus state between two timestamps
+        
+        States are derived as in get_focus_states_between.
+        """
+        try:
+            with self._read_connection() as conn:
+                return dict(conn.execute(_SQL_COUNT_FOCUS_STATES_BETWEEN, (start, end)).fetchall())
+            
+        except Exception as e:
+            logger.error(f"Error counting focus states: {e}")
+            raise DatabaseError(f"Failed to count focus states: {e}")
+
+    def get_hourly_patterns_between(self, start: datetime, end: datetime) -> List[Tuple[int, int, float, int]]:
+        """Get (hour, snapshots, average focus score, activities) per local hour
+        
+        Hours without snapshots are omitted.
+        """
+        try:
+            with self._read_connection() as conn:
+                return conn.execute(_SQL_HOURLY_PATTERNS_BETWEEN, (start, end)).fetchall()
+            
+        except Exception as e:
+            logger.error(f"Error getting hourly patterns: {e}")
+            raise DatabaseError(f"Failed to get hourly patterns: {e}")
+
     def store_focus_session(self, session: FocusSession) -> None:
         """Store a focus session in the database"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT INTO focus_sessions (
-                    start_time,
-                    end_time,
-                    duration_minutes,
-                    activity_type,
-                    interruption_count,
-                    context_switches,
-                    attention_score
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                session.start_time.strftime('%Y-%m-%d %H:%M:%S'),  # Format datetime
-                session.end_time.strftime('%Y-%m-%d %H:%M:%S') if session.end_time else None,
-                session.duration_minutes,
-                session.activity_type,
-                0,  # interruption_count - will implement later
-                session.context_switches,
-                session.attention_score
-            ))
+            with self._write_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute(_SQL_INSERT_FOCUS_SESSION, (
+                    session.start_time,
+                    session.end_time,
+                    session.duration_minutes,
+                    session.activity_type,
+                    0,  # interruption_count - will implement later
+                    session.context_switches,
+                    session.attention_score
+                ))
             
-            session_id = cursor.lastrowid
+                session_id = cursor.lastrowid
             
-            # Store any triggers
-            for trigger in session.triggers:
-                cursor.execute("""
-                    INSERT INTO focus_triggers (
+                # Store any triggers
+                cursor.executemany(_SQL_INSERT_FOCUS_TRIGGER, [
+                    (
                         session_id,
-                        trigger_time,
-                        trigger_type,
-                        trigger_source,
-                        recovery_time_seconds
-                    ) VALUES (?, ?, ?, ?, ?)
-                """, (
-                    session_id,
-                    trigger.timestamp.strftime('%Y-%m-%d %H:%M:%S'),  # Format datetime
-                    trigger.type,
-                    trigger.source,
-                    trigger.recovery_time
-                ))
+                        trigger.timestamp,
+                        trigger.type,
+                        trigger.source,
+                        trigger.recovery_time
+                    )
+                    for trigger in session.triggers
+                ])
             
-            self.conn.commit()
+                conn.commit()
             
         except Exception as e:
-            self.conn.rollback()
+            with self._write_connection() as conn:
+                if conn.in_transaction:
+                    conn.rollback()
             logger.error(f"Failed to store focus session: {e}")
             raise DatabaseError(f"Failed to store focus session: {e}") 
 
     def get_focus_sessions(self, hours: int = 24) -> List[FocusSession]:
         """Get focus sessions from the last N hours"""
         try:
-            cursor = self.conn.cursor()
-            
             # Calculate cutoff time
-            cutoff = (datetime.now() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+            cutoff = datetime.now() - timedelta(hours=hours)
             
-            cursor.execute("""
-                SELECT 
-                    id,
-                    start_time,
-                    end_time,
-                    duration_minutes,
-                    activity_type,
-                    context_switches,
-                    attention_score
-                FROM focus_sessions
-                WHERE start_time >= ?
-                ORDER BY start_time DESC
-            """, (cutoff,))
+            with self._read_connection() as conn:
+                rows = conn.execute("""
+                    SELECT 
+                        id,
+                        start_time,
+                        end_time,
+                        duration_minutes,
+                        activity_type,
+                        context_switches,
+                        attention_score
+                    FROM focus_sessions
+                    WHERE start_time >= ?
+                    ORDER BY start_time DESC
+                """, (cutoff,)).fetchall()
             
             sessions = []
-            for row in cursor.fetchall():
+            for row in rows:
                 session = FocusSession(
-                    start_time=datetime.fromisoformat(row[1].replace(' ', 'T')),
+                    start_time=row[1],
                     activity_type=row[4],
-                    end_time=datetime.fromisoformat(row[2].replace(' ', 'T')) if row[2] else None,
+                    end_time=row[2],
                     duration_minutes=row[3],
                     context_switches=row[5],
                     attention_score=row[6]
@@ -926,61 +1717,70 @@ class DatabaseManager:
             logger.error(f"Failed to get focus sessions: {e}")
             raise DatabaseError(f"Failed to get focus sessions: {e}") 
 
-    def store_summaries(self, summaries: List[ScreenSummary]) -> None:
-        """Store screen summaries in the database"""
+    def store_summaries(self, summaries: List[ScreenSummary]) -> List[int]:
+        """Store screen summaries in a single transaction
+
+        Returns the snapshot ids in the same order as ``summaries``.
+        """
+        if not summaries:
+            return []
+
         try:
-            conn = self.get_connection()
-            try:
-                conn.execute("BEGIN TRANSACTION")
-                
-                for summary in summaries:
-                    # Debug log the summary being stored
-                    logger.debug(f"Storing summary from {summary.timestamp}: {summary.summary[:100]}...")
-                    
-                    cursor = conn.execute("""
-                        INSERT INTO activity_snapshots 
-                        (timestamp, summary) 
-                        VALUES (?, ?)
-                        """, (
-                            summary.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                            summary.summary
+            with self._write_connection() as conn:
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+
+                    conn.executemany(_SQL_INSERT_BATCH_SNAPSHOT, [
+                        (
+                            summary.timestamp,
+                            summary.summary,
+                            self._calculate_focus_score(summary)
                         )
-                    )
-                    snapshot_id = cursor.lastrowid
-                    
-                    # Debug log each activity
-                    for activity in summary.activities:
-                        logger.debug(f"Storing activity: {activity.name} for snapshot {snapshot_id}")
-                        conn.execute("""
-                            INSERT INTO activities 
-                            (snapshot_id, name, category, purpose, 
-                             attention_level, context_switches, workspace_organization)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
-                            """, (
-                                snapshot_id,
-                                activity.name,
-                                activity.category,
-                                activity.purpose,
-                                activity.focus_indicators.attention_level,
-                                activity.focus_indicators.context_switches,
-                                activity.focus_indicators.workspace_organization
-                            )
+                        for summary in summaries
+                    ])
+
+                    # AUTOINCREMENT ids are consecutive while we hold the
+                    # write lock, so the batch ends at last_insert_rowid()
+                    last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                    snapshot_ids = list(range(last_id - len(summaries) + 1, last_id + 1))
+
+                    conn.executemany(_SQL_INSERT_ACTIVITY, [
+                        (
+                            snapshot_id,
+                            activity.name,
+                            activity.category,
+                            activity.purpose,
+                            activity.focus_indicators.attention_level,
+                            _CONTEXT_SWITCH_CODES.get(activity.focus_indicators.context_switches, 0),
+                            _ORGANIZATION_CODES.get(activity.focus_indicators.workspace_organization, 0)
                         )
-                
-                conn.commit()
-                logger.info(f"Stored {len(summaries)} summaries in database")
-                
-                # Verify storage
-                cursor = conn.execute("SELECT COUNT(*) FROM activity_snapshots")
-                total_snapshots = cursor.fetchone()[0]
-                logger.info(f"Total snapshots in database: {total_snapshots}")
-                
-            except Exception as e:
-                conn.rollback()
-                raise e
-            finally:
-                conn.close()
-                
+                        for snapshot_id, summary in zip(snapshot_ids, summaries)
+                        for activity in summary.activities
+                    ])
+
+                    with_context = [
+                        (snapshot_id, summary.context)
+                        for snapshot_id, summary in zip(snapshot_ids, summaries)
+                        if summary.context
+                    ]
+                    conn.executemany(_SQL_INSERT_FOCUS_STATE, [
+                        (snapshot_id, context.attention_state, context.confidence)
+                        for snapshot_id, context in with_context
+                    ])
+                    conn.executemany(_SQL_INSERT_ENVIRONMENT, [
+                        (snapshot_id, context.environment)
+                        for snapshot_id, context in with_context
+                        if context.environment
+                    ])
+
+                    conn.commit()
+                    logger.info(f"Stored {len(summaries)} summaries in database")
+                    return snapshot_ids
+
+                except Exception as e:
+                    conn.rollback()
+                    raise e
+
         except Exception as e:
             logger.error(f"Failed to store summaries: {e}")
             raise DatabaseError(f"Failed to store summaries: {e}") 
\ No newline at end of file
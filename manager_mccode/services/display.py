@@ -1,7 +1,8 @@
+from collections import Counter
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 import os
-from rich.console import Console
+from rich.console import Console, Group
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
@@ -13,7 +14,8 @@ class TerminalDisplay:
     def __init__(self):
         self.console = Console()
         
-    def show_recent_summaries(self, summaries: List[Dict], hours: float = 1.0):
+    def show_recent_summaries(self, summaries: List[Dict], hours: float = 1.0,
+                              session_stats: Optional[Dict] = None):
         """Display recent summaries in a nice terminal format"""
         # Clear screen
         os.system('cls' if os.name == 'nt' else 'clear')
@@ -22,12 +24,16 @@ class TerminalDisplay:
         header = Text()
         header.append("📊 Manager McCode Activity Monitor", style="bold cyan")
         header.append(f"\nShowing last {hours} hours of activity\n", style="dim")
-        self.console.print(Panel(header, expand=False))
+        output = [Panel(header, expand=False)]
         
         if not summaries:
-            self.console.print("\n[yellow]No recent activities recorded[/yellow]")
+            output.append("\n[yellow]No recent activities recorded[/yellow]")
+            self.console.print(Group(*output))
             return
 
+        # Attention states across all buckets, for the fallback focus score
+        state_totals = Counter()
+        
         # Show detailed summaries in reverse chronological order
         for summary in reversed(summaries):
             time_str = summary['bucket'].strftime('%H:%M')
@@ -35,7 +41,8 @@ class TerminalDisplay:
             summary_text = summary['combined_summaries']
             snapshot_count = summary['snapshot_count']
             contexts = summary.get('contexts', [])
-            attention_states = summary.get('attention_states', [])
+            state_counts = Counter(summary.get('attention_states', []))
+            state_totals.update(state_counts)
             
             # Create time block header
             time_header = Text()
@@ -43,8 +50,10 @@ class TerminalDisplay:
             time_header.append(f" ({snapshot_count} snapshots)", style="dim")
             
             # Add attention state if available
-            if attention_states:
-                primary_state = max(set(attention_states), key=attention_states.count)
+            primary_state = summary.get('primary_state')
+            if primary_state is None and state_counts:
+                primary_state = state_counts.most_common(1)[0][0]
+            if primary_state:
                 state_emoji = {
                     'focused': '🎯',
                     'scattered': '🔄',
@@ -52,12 +61,12 @@ class TerminalDisplay:
                 }.get(primary_state, '❓')
                 time_header.append(f" {state_emoji} {primary_state}", style="bold yellow")
             
-            self.console.print("\n" + "="*80)
-            self.console.print(time_header)
+            output.append("\n" + "="*80)
+            output.append(time_header)
             
             # Show activities with their context
             if activities:
-                self.console.print("\n[bold green]Activities:[/bold green]")
+                output.append("\n[bold green]Activities:[/bold green]")
                 for activity_group in activities:
                     for activity in activity_group:
                         if isinstance(activity, dict):
@@ -90,51 +99,41 @@ class TerminalDisplay:
                                 if focus_text:
                                     activity_text.append(f" ({', '.join(focus_text)})", style="italic dim")
                                 
-                            self.console.print(activity_text)
+                            output.append(activity_text)
             
             # Show context if available
             if contexts:
                 context = contexts[0]  # Take first context as representative
                 if isinstance(context, dict):
-                    self.console.print("\n[bold magenta]Context:[/bold magenta]")
+                    output.append("\n[bold magenta]Context:[/bold magenta]")
                     if primary_task := context.get('primary_task'):
-                        self.console.print(f"  Task: {primary_task}")
+                        output.append(f"  Task: {primary_task}")
                     if environment := context.get('environment'):
-                        self.console.print(f"  Environment: {environment}")
+                        output.append(f"  Environment: {environment}")
             
             # Show summary
             if summary_text:
-                self.console.print("\n[bold white]Summary:[/bold white]")
+                output.append("\n[bold white]Summary:[/bold white]")
                 for idx, detail in enumerate(summary_text.split(" | ")):
                     if detail.strip():
-                        self.console.print(f"  {idx+1}. {detail.strip()}")
+                        output.append(f"  {idx+1}. {detail.strip()}")
             
-            self.console.print("-"*80)
-        
-        # Show overall statistics with enhanced metrics
-        total_snapshots = sum(s['snapshot_count'] for s in summaries)
-        total_minutes = len(summaries) * 15
+            output.append("-"*80)
         
-        # Collect all unique activities and their contexts
-        all_activities = []
-        for s in summaries:
-            for activity_group in s['all_activities']:
-                all_activities.extend([
-                    act for act in activity_group 
-                    if isinstance(act, dict)
-                ])
-        
-        # Calculate focus metrics
-        attention_states = [
-            state 
-            for s in summaries 
-            if 'attention_states' in s
-            for state in s['attention_states']
-        ]
-        focus_percentage = (
-            attention_states.count('focused') / len(attention_states)
-            if attention_states else 0
-        ) * 100
+        # Show overall statistics, preferring totals aggregated by the database
+        if session_stats is None:
+            total_states = sum(state_totals.values())
+            session_stats = {
+                'total_snapshots': sum(s['snapshot_count'] for s in summaries),
+                'total_minutes': len(summaries) * 15,
+                'focus_percentage': (
+                    state_totals['focused'] / total_states
+                    if total_states else 0
+                ) * 100
+            }
+        total_snapshots = session_stats['total_snapshots']
+        total_minutes = session_stats['total_minutes']
+        focus_percentage = session_stats['focus_percentage']
         
         stats = Text()
         stats.append("\n📈 Session Statistics\n", style="bold yellow")
@@ -142,4 +141,8 @@ class TerminalDisplay:
         stats.append(f"Total Snapshots: {total_snapshots}\n", style="dim")
         stats.append(f"Focus Score: {focus_percentage:.1f}%\n", style="bold green")
         
-        self.console.print(Panel(stats, expand=False)) 
\ No newline at end of file
+        output.append(Panel(stats, expand=False))
+        
+        # One print renders and flushes everything at once instead of
+        # taking the console lock and flushing per line
+        self.console.print(Group(*output)) 
\ No newline at end of file
@@ -7,12 +7,29 @@ from typing import Optional, List, Dict, Any
 import mss
 from PIL import Image
 import io
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
 
 from manager_mccode.config.settings import settings
 from manager_mccode.services.errors import ImageError
 
 logger = logging.getLogger(__name__)
 
+# File extension and MIME type for each supported screenshot format
+SCREENSHOT_FORMATS = {
+    "JPEG": (".jpg", "image/jpeg"),
+    "WEBP": (".webp", "image/webp"),
+}
+SCREENSHOT_EXTENSIONS = tuple(ext for ext, _ in SCREENSHOT_FORMATS.values())
+_MIME_TYPES = dict(SCREENSHOT_FORMATS.values())
+
+
+def screenshot_mime_type(path) -> str:
+    """MIME type of a screenshot file, judged by its extension"""
+    suffix = os.path.splitext(str(path))[1].lower()
+    return _MIME_TYPES.get(suffix) or mimetypes.guess_type(str(path))[0] or "image/jpeg"
+
+
 class ScreenshotError(ImageError):
     """Exception raised when screenshot capture fails"""
     pass
@@ -38,10 +55,22 @@ class ImageManager:
         except Exception as e:
             raise ScreenshotError(f"Failed to initialize screenshot manager: {e}")
         
+        # Decode/resize/encode runs here rather than on asyncio's shared
+        # default executor, so a slow encode can't starve other to_thread
+        # users and at most two frames are in flight at once
+        self._encode_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="screenshot")
+        
         # Compression settings
         self.JPEG_QUALITY = 85  # Good balance between quality and size
+        self.JPEG_OPTIMIZE = False  # Extra Huffman pass saves a few % of size for a much slower encode
+        self.JPEG_SUBSAMPLING = 2  # 4:2:0 chroma; a quarter of the chroma blocks to DCT vs 4:4:4
         self.MAX_DIMENSION = 1920  # Max width/height for screenshots
-        self.COMPRESSION_FORMAT = "JPEG"  # JPEG is better for screenshots than PNG
+        self.RESIZE_REDUCING_GAP = 3.0  # Visually indistinguishable from a plain LANCZOS resize
+        self.COMPRESSION_FORMAT = settings.SCREENSHOT_FORMAT.upper()  # Either beats PNG for screenshots
+        self.WEBP_METHOD = 4  # libwebp effort, 0 (fast) - 6 (small)
+        self.WRITE_BUFFER_BYTES = 1 << 20  # Encoder output reaches disk in few large writes
+        if self.COMPRESSION_FORMAT not in SCREENSHOT_FORMATS:
+            raise CompressionError(f"Unsupported screenshot format: {settings.SCREENSHOT_FORMAT}")
         
     async def capture_screenshot(self) -> Path:
         """Capture and optimize a screenshot
@@ -59,20 +88,32 @@ class ImageManager:
             except Exception as e:
                 raise ScreenshotError(f"Failed to grab screenshot: {e}")
             
-            # Convert to PIL Image
-            try:
-                img = Image.frombytes('RGB', screenshot.size, screenshot.bgra, 'raw', 'BGRX')
-            except Exception as e:
-                raise ScreenshotError(f"Failed to convert screenshot: {e}")
-            
-            # Process in thread pool to avoid blocking
-            return await asyncio.to_thread(self._process_image, img)
+            # Decode and process in thread pool to avoid blocking; the
+            # BGRX unpack is a full-frame pass of its own
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._encode_pool, self._convert_and_process, screenshot)
             
         except ScreenshotError:
             raise
         except Exception as e:
             raise ScreenshotError(f"Failed to capture screenshot: {e}")
     
+    def _convert_and_process(self, screenshot: Any) -> Path:
+        """Build a PIL image from a raw mss grab and process it
+        
+        Args:
+            screenshot: mss ScreenShot with BGRA pixel data
+            
+        Returns:
+            Path: Path to processed image
+        """
+        try:
+            img = Image.frombytes('RGB', screenshot.size, screenshot.bgra, 'raw', 'BGRX')
+        except Exception as e:
+            raise ScreenshotError(f"Failed to convert screenshot: {e}")
+        
+        return self._process_image(img)
+    
     def _process_image(self, img: Image.Image) -> Path:
         """Process and optimize screenshot
         
@@ -83,28 +124,42 @@ class ImageManager:
             Path: Path to processed image
         """
         try:
-            # Convert to RGB (remove alpha channel)
-            if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
+            # Frames from _convert_and_process are already opaque RGB
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
             
-            # Resize if needed
+            # Resize if needed. reducing_gap box-reduces by an integer factor
+            # first, so LANCZOS only runs over the last <3x of the downscale.
             if max(img.size) > self.MAX_DIMENSION:
                 ratio = self.MAX_DIMENSION / max(img.size)
                 new_size = tuple(int(dim * ratio) for dim in img.size)
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
+                img = img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=self.RESIZE_REDUCING_GAP)
             
             # Save optimized image
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = self.temp_dir / f"screenshot_{timestamp}.jpg"
+            # Microseconds keep names unique with two frames encoding at once
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            extension = SCREENSHOT_FORMATS[self.COMPRESSION_FORMAT][0]
+            output_path = self.temp_dir / f"screenshot_{timestamp}{extension}"
             
-            img.save(
-                output_path,
-                format=self.COMPRESSION_FORMAT,
-                quality=self.JPEG_QUALITY,
-                optimize=True
-            )
+            if self.COMPRESSION_FORMAT == "WEBP":
+                save_options = {"quality": self.JPEG_QUALITY, "method": self.WEBP_METHOD}
+            else:
+                save_options = {
+                    "quality": self.JPEG_QUALITY,
+                    "optimize": self.JPEG_OPTIMIZE,
+                    "subsampling": self.JPEG_SUBSAMPLING
+                }
+            
+            # Encode into a .tmp sibling and rename it into place, so the
+            # screenshot globs never see a half-written file
+            tmp_path = output_path.with_name(output_path.name + ".tmp")
+            try:
+                with open(tmp_path, "wb", buffering=self.WRITE_BUFFER_BYTES) as f:
+                    img.save(f, format=self.COMPRESSION_FORMAT, **save_options)
+                os.replace(tmp_path, output_path)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
             
             return output_path
             
@@ -118,18 +173,30 @@ class ImageManager:
             max_age_minutes: Optional override for maximum age of files to keep
         """
         max_age = max_age_minutes or settings.SCREENSHOT_RETENTION_DAYS * 24 * 60
-        cutoff_time = datetime.now() - timedelta(minutes=max_age)
+        cutoff_ts = (datetime.now() - timedelta(minutes=max_age)).timestamp()
         
         try:
-            for file in self.temp_dir.glob("screenshot_*.jpg"):
-                if file.stat().st_mtime < cutoff_time.timestamp():
-                    file.unlink()
+            # The directory walk and unlinks are all blocking syscalls
+            await asyncio.to_thread(self._remove_images_before, cutoff_ts)
         except Exception as e:
             logger.error(f"Error cleaning up old images: {e}")
     
+    def _remove_images_before(self, cutoff_ts: float) -> None:
+        """Delete screenshots last modified before a POSIX timestamp"""
+        # scandir hands back names and paths without building Path
+        # objects or matching a glob pattern per entry
+        with os.scandir(self.temp_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if not (name.startswith("screenshot_") and name.endswith(SCREENSHOT_EXTENSIONS)):
+                    continue
+                if entry.stat().st_mtime < cutoff_ts:
+                    os.unlink(entry.path)
+    
     async def cleanup(self) -> None:
         """Cleanup resources"""
         try:
+            self._encode_pool.shutdown(wait=True)
             self.sct.close()
         except Exception as e:
             logger.error(f"Error closing screenshot manager: {e}") 
\ No newline at end of file
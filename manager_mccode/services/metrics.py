@@ -1,16 +1,95 @@
 """Collect and analyze performance metrics"""
 import logging
+import time as _time
+from collections import Counter
 from datetime import datetime, timedelta, time
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from manager_mccode.services.database import DatabaseManager
 
 logger = logging.getLogger(__name__)
 
+# How long a cached query result is reused. Windows that ended before
+# today only change through retention cleanup or a late batch, so they
+# keep much longer than ones still receiving snapshots.
+_LIVE_TTL_SECONDS = 60
+_HISTORICAL_TTL_SECONDS = 3600
+_CACHE_MAX_ENTRIES = 512
+
 class MetricsCollector:
     """Collects and formats activity metrics for analysis"""
     
     def __init__(self, db: DatabaseManager):
         self.db = db
+        # (query name, start, end) -> (expires at, result)
+        self._cache: Dict[Tuple[str, datetime, datetime], Tuple[float, Any]] = {}
+
+    def invalidate(self) -> None:
+        """Drop all cached query results"""
+        self._cache.clear()
+
+    def _cached(self, name: str, start: datetime, end: datetime, compute: Callable[[], Any]) -> Any:
+        """Return compute()'s result for a range, reusing a recent one
+        
+        Failures propagate and are not cached.
+        """
+        key = (name, start, end)
+        now = _time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        
+        result = compute()
+        
+        if len(self._cache) >= _CACHE_MAX_ENTRIES:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+            if len(self._cache) >= _CACHE_MAX_ENTRIES:
+                del self._cache[next(iter(self._cache))]
+        historical = end < datetime.combine(datetime.now().date(), time.min)
+        ttl = _HISTORICAL_TTL_SECONDS if historical else _LIVE_TTL_SECONDS
+        self._cache[key] = (now + ttl, result)
+        return result
+
+    def _query(self, name: str, start: datetime, end: datetime) -> Any:
+        """Run a DatabaseManager range query through the cache"""
+        return self._cached(name, start, end, lambda: getattr(self.db, name)(start, end))
+
+    def _snapshot_stats(self, start: datetime, end: datetime) -> Dict:
+        """Fold a range's snapshots once, shared by the summary and aggregate views
+        
+        Only the folded totals are cached, not the snapshot rows.
+        """
+        return self._cached(
+            "snapshot_stats", start, end,
+            lambda: self._fold_snapshots(self.db.get_snapshots_between(start, end) or [])
+        )
+
+    def _fold_snapshots(self, snapshots: List[Dict]) -> Dict:
+        """Collect every per-snapshot total in a single walk"""
+        timestamps = []
+        score_sum = 0.0
+        score_count = 0
+        high_switches = 0
+        
+        for snapshot in snapshots:
+            score = snapshot.get("focus_score")
+            if score is not None:
+                score_sum += score
+                score_count += 1
+            if snapshot.get("context_switches") == "high":
+                high_switches += 1
+            
+            timestamp = snapshot.get("timestamp")
+            if timestamp:
+                timestamps.append(timestamp)
+        
+        timestamps.sort()
+        return {
+            "total_snapshots": len(snapshots),
+            "score_sum": score_sum,
+            "score_count": score_count,
+            "high_switches": high_switches,
+            "active_hours": self._active_hours(timestamps)
+        }
 
     def get_daily_metrics(self, date: Optional[datetime] = None) -> Dict:
         """Get metrics for a specific date"""
@@ -45,8 +124,8 @@ class MetricsCollector:
     def _get_daily_summary(self, start: datetime, end: datetime) -> Dict:
         """Get summary metrics for a day"""
         try:
-            snapshots = self.db.get_snapshots_between(start, end) or []
-            if not snapshots:
+            stats = self._snapshot_stats(start, end)
+            if not stats["total_snapshots"]:
                 return {
                     "active_hours": 0.0,
                     "context_switches": 0,
@@ -55,12 +134,11 @@ class MetricsCollector:
                     "date": start.strftime("%Y-%m-%d")
                 }
             
-            focus_scores = [s.get("focus_score", 0) for s in snapshots]
             return {
-                "active_hours": self._calculate_active_hours(snapshots),
-                "context_switches": len([s for s in snapshots if s.get("context_switches") == "high"]),
-                "focus_score": sum(focus_scores) / len(focus_scores) if focus_scores else 0.0,
-                "total_snapshots": len(snapshots),
+                "active_hours": stats["active_hours"],
+                "context_switches": stats["high_switches"],
+                "focus_score": stats["score_sum"] / stats["score_count"] if stats["score_count"] else 0.0,
+                "total_snapshots": stats["total_snapshots"],
                 "date": start.strftime("%Y-%m-%d")
             }
         except Exception as e:
@@ -76,17 +154,11 @@ class MetricsCollector:
     def _get_activity_breakdown(self, start: datetime, end: datetime) -> Dict:
         """Get detailed activity metrics"""
         try:
-            activities = self.db.get_activities_between(start, end)
-            
-            # Group by category
-            categories = {}
-            for activity in activities:
-                category = activity.get("category", "unknown")
-                categories[category] = categories.get(category, 0) + 1
+            categories = self._query("count_activity_categories_between", start, end)
                 
             return {
                 "categories": categories,
-                "total_activities": len(activities)
+                "total_activities": sum(categories.values())
             }
         except Exception as e:
             logger.error(f"Error getting activity breakdown: {e}")
@@ -95,18 +167,13 @@ class MetricsCollector:
     def _get_focus_distribution(self, start: datetime, end: datetime) -> Dict:
         """Get focus state distribution"""
         try:
-            states = self.db.get_focus_states_between(start, end)
-            
             distribution = {
                 "focused": 0,
                 "neutral": 0,
                 "scattered": 0,
                 "unknown": 0
             }
-            
-            for state in states:
-                state_type = state.get("state_type", "unknown")
-                distribution[state_type] = distribution.get(state_type, 0) + 1
+            distribution.update(self._query("count_focus_states_between", start, end))
                 
             return distribution
         except Exception as e:
@@ -116,23 +183,16 @@ class MetricsCollector:
     def _get_hourly_patterns(self, start: datetime, end: datetime) -> Dict[int, Dict]:
         """Get activity patterns by hour"""
         try:
-            snapshots = self.db.get_snapshots_between(start, end) or []
             patterns = {hour: {"snapshots": 0, "focus_score": 0.0, "activities": 0} 
                         for hour in range(24)}
             
-            for snapshot in snapshots:
-                timestamp = snapshot.get("timestamp")
-                if not timestamp:
-                    continue
-                hour = timestamp.hour
-                patterns[hour]["snapshots"] += 1
-                patterns[hour]["focus_score"] += snapshot.get("focus_score", 0)
-                patterns[hour]["activities"] += len(snapshot.get("activities") or [])
-            
-            # Safe average calculation
-            for hour in patterns:
-                if patterns[hour]["snapshots"] > 0:
-                    patterns[hour]["focus_score"] /= patterns[hour]["snapshots"]
+            # At most 24 pre-aggregated rows; empty hours keep their zeros
+            for hour, count, avg_focus_score, activities in self._query("get_hourly_patterns_between", start, end):
+                patterns[hour] = {
+                    "snapshots": count,
+                    "focus_score": avg_focus_score,
+                    "activities": activities
+                }
             
             return patterns
         except Exception as e:
@@ -142,24 +202,18 @@ class MetricsCollector:
 
     def _calculate_active_hours(self, snapshots: List[Dict]) -> float:
         """Calculate approximate active hours"""
-        if not snapshots:
-            return 0.0
-        
         # Sort by timestamp and filter out None timestamps
-        valid_snapshots = [s for s in snapshots if s.get("timestamp")]
-        if not valid_snapshots:
-            return 0.0
-        
-        sorted_snapshots = sorted(valid_snapshots, key=lambda x: x["timestamp"])
-        
-        # Calculate time differences
+        return self._active_hours(sorted(s["timestamp"] for s in snapshots if s.get("timestamp")))
+
+    def _active_hours(self, timestamps: List[datetime]) -> float:
+        """Sum the gaps under 30 minutes between sorted timestamps, in hours"""
         total_minutes = 0
-        for i in range(len(sorted_snapshots) - 1):
+        for earlier, later in zip(timestamps, timestamps[1:]):
             try:
-                diff = sorted_snapshots[i + 1]["timestamp"] - sorted_snapshots[i]["timestamp"]
+                diff = (later - earlier).total_seconds()
                 # Only count gaps less than 30 minutes
-                if diff.total_seconds() < 1800:  # 30 minutes
-                    total_minutes += diff.total_seconds() / 60
+                if diff < 1800:  # 30 minutes
+                    total_minutes += diff / 60
             except (TypeError, AttributeError):
                 continue
             
@@ -167,11 +221,7 @@ class MetricsCollector:
 
     def _get_primary_tasks(self, snapshots: List[Dict]) -> Dict:
         """Get distribution of primary tasks"""
-        tasks = {}
-        for snapshot in snapshots:
-            task = snapshot.get("primary_task", "unknown")
-            tasks[task] = tasks.get(task, 0) + 1
-        return tasks 
+        return dict(Counter(snapshot.get("primary_task", "unknown") for snapshot in snapshots))
 
     def _get_daily_metrics_series(self, start: datetime, end: datetime) -> List[Dict]:
         """Get metrics for each day in the timeframe"""
@@ -196,12 +246,10 @@ class MetricsCollector:
         """Get aggregated metrics for the entire timeframe"""
         try:
             # Get all data for the period
-            snapshots = self.db.get_snapshots_between(start, end) or []
-            activities = self.db.get_activities_between(start, end) or []
-            focus_states = self.db.get_focus_states_between(start, end) or []
+            stats = self._snapshot_stats(start, end)
             
             # Calculate aggregates
-            total_snapshots = len(snapshots)
+            total_snapshots = stats["total_snapshots"]
             if not total_snapshots:
                 return {
                     "total_snapshots": 0,
@@ -217,31 +265,23 @@ class MetricsCollector:
                     "average_focus_score": 0.0
                 }
             
-            # Activity category distribution
-            category_counts = {}
-            for activity in activities:
-                category = activity.get("category", "unknown")
-                category_counts[category] = category_counts.get(category, 0) + 1
-            
-            # Focus state distribution
+            # Activity category and focus state distributions, counted in SQL
+            category_counts = self._query("count_activity_categories_between", start, end)
             focus_distribution = {
                 "focused": 0,
                 "neutral": 0,
                 "scattered": 0,
                 "unknown": 0
             }
-            for state in focus_states:
-                state_type = state.get("state_type", "unknown")
-                focus_distribution[state_type] = focus_distribution.get(state_type, 0) + 1
+            focus_distribution.update(self._query("count_focus_states_between", start, end))
             
             # Calculate average focus score
-            focus_scores = [s.get("focus_score", 0) for s in snapshots if s.get("focus_score") is not None]
-            avg_focus_score = sum(focus_scores) / len(focus_scores) if focus_scores else 0
+            avg_focus_score = stats["score_sum"] / stats["score_count"] if stats["score_count"] else 0
             
             return {
                 "total_snapshots": total_snapshots,
                 "timeframe_hours": (end - start).total_seconds() / 3600,
-                "active_hours": self._calculate_active_hours(snapshots),
+                "active_hours": stats["active_hours"],
                 "category_distribution": category_counts,
                 "focus_distribution": focus_distribution,
                 "average_focus_score": round(avg_focus_score, 2)
@@ -3,6 +3,8 @@ import os
 import asyncio
 import logging
 import signal
+from collections import deque
+from concurrent.futures import Future
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
@@ -35,6 +37,8 @@ class ServiceRunner:
         self.last_batch_time: Optional[datetime] = None
         self.last_cleanup_time: Optional[datetime] = None
         self.error_count = 0
+        # Writer-thread failures, handed back to the loop's error count
+        self._failed_writes = deque()
         
         # Constants
         self.MAX_ERRORS = 3
@@ -68,6 +72,15 @@ class ServiceRunner:
                 lambda s=sig: asyncio.create_task(self.shutdown(sig))
             )
     
+    def _on_summary_stored(self, future: Future) -> None:
+        """Log a failed summary write and queue it for the main loop"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Failed to store summary: {error}")
+            self._failed_writes.append(error)
+    
     async def shutdown(self, sig: Optional[signal.Signals] = None):
         """Gracefully shutdown the service"""
         if sig:
@@ -125,6 +138,10 @@ class ServiceRunner:
         try:
             while self.running:
                 try:
+                    # Count a summary write that failed since the last pass
+                    if self._failed_writes:
+                        raise self._failed_writes.popleft()
+                    
                     # Take screenshot
                     screenshot_path = await self.image_manager.capture_screenshot()
                     self.last_screenshot_time = datetime.now()
@@ -136,10 +153,8 @@ class ServiceRunner:
                     if self.batch_processor.is_batch_ready():
                         summaries = await self.batch_processor.process_batch()
                         if summaries:
-                            try:
-                                await asyncio.to_thread(self.db.store_summaries, summaries)
-                            except Exception as e:
-                                logger.error(f"Failed to store summaries: {e}")
+                            for summary in summaries:
+                                self.db.enqueue_summary(summary).add_done_callback(self._on_summary_stored)
                     
                     # Reset error count on successful iteration
                     self.error_count = 0
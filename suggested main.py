@@ -34,7 +34,8 @@ async def run(self):
                     
                     # Show recent summaries
                     recent_summaries = self.db_manager.get_recent_fifteen_min_summaries(hours=1.0)
-                    self.display.show_recent_summaries(recent_summaries)
+                    session_stats = self.db_manager.get_session_stats(hours=1.0)
+                    self.display.show_recent_summaries(recent_summaries, session_stats=session_stats)
                     
                     self.batch_processor.last_batch_time = current_time
 
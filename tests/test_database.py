@@ -5,6 +5,8 @@ from manager_mccode.models.screen_summary import ScreenSummary, Activity, FocusI
 import logging
 from dataclasses import replace
 import copy
+import threading
+import asyncio
 
 logger = logging.getLogger(__name__)
 
@@ -150,4 +152,223 @@ def test_focus_metrics(db, sample_summary):
     # Verify activity data
     focus_states = [a['focus_state'] for a in activity]
     assert "focused" in focus_states
-    assert "scattered" in focus_states 
\ No newline at end of file
+    assert "scattered" in focus_states 
+
+def test_focus_score_stored_with_summary(db, sample_summary):
+    """Test that the computed focus score is stored on the snapshot"""
+    summary_id = db.store_summary(sample_summary)
+    
+    score = db.conn.execute(
+        "SELECT focus_score FROM activity_snapshots WHERE id = ?", (summary_id,)
+    ).fetchone()[0]
+    
+    # 0.5 * 0.75 + 0.3 * 0.9 (low switches) + 0.2 * 0.9 (organized)
+    assert score == pytest.approx(82.5)
+    
+    # Deterministic for the same input
+    assert db._calculate_focus_score(sample_summary) == score
+    
+    empty = copy.deepcopy(sample_summary)
+    empty.activities = []
+    assert db._calculate_focus_score(empty) == 0.0
+
+
+def test_recent_fifteen_min_summaries_buckets(db, sample_summary):
+    """Test that snapshots are grouped into 15-minute buckets, oldest first"""
+    start = datetime.now().replace(second=0, microsecond=0) - timedelta(minutes=50)
+    start -= timedelta(minutes=start.minute % 15)  # align to a bucket boundary
+    
+    summaries = []
+    for offset in (0, 5, 20):
+        summary = copy.deepcopy(sample_summary)
+        summary.timestamp = start + timedelta(minutes=offset)
+        summaries.append(summary)
+    db.store_summaries(summaries)
+    
+    buckets = db.get_recent_fifteen_min_summaries(hours=2)
+    assert [b['bucket'] for b in buckets] == [start, start + timedelta(minutes=15)]
+    assert [b['snapshot_count'] for b in buckets] == [2, 1]
+    
+    first = buckets[0]
+    assert len(first['all_activities']) == 2
+    assert first['all_activities'][0][0]['name'] == "Writing tests"
+    assert first['attention_states'] == ["scattered", "scattered"]
+    assert first['primary_state'] == "scattered"
+    assert first['contexts'][0]['environment'] == "Single monitor setup"
+
+
+def test_enqueued_summaries_flushed_on_close(sample_summary):
+    """Test that queued summaries are committed before close returns"""
+    db = DatabaseManager(":memory:")
+    futures = [db.enqueue_summary(copy.deepcopy(sample_summary)) for _ in range(10)]
+    
+    ids = [future.result(timeout=5) for future in futures]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 10
+    
+    db.close()
+    with pytest.raises(DatabaseError):
+        db.enqueue_summary(sample_summary)
+
+
+def test_failed_summary_does_not_reject_its_batch(sample_summary):
+    """Test that one bad summary in a writer batch fails only its own future"""
+    db = DatabaseManager(":memory:")
+    release = threading.Event()
+    db._submit_write(lambda conn: release.wait(5))  # hold the writer so the next three batch up
+    
+    bad = copy.deepcopy(sample_summary)
+    bad.timestamp = object()
+    futures = [
+        db.enqueue_summary(copy.deepcopy(sample_summary)),
+        db.enqueue_summary(bad),
+        db.enqueue_summary(copy.deepcopy(sample_summary)),
+    ]
+    release.set()
+    
+    with pytest.raises(DatabaseError):
+        futures[1].result(timeout=5)
+    ids = [futures[0].result(timeout=5), futures[2].result(timeout=5)]
+    assert ids[0] < ids[1]
+    db.close()
+
+
+def test_focus_metrics_session_durations_positive(db, sample_summary):
+    """Test that focus sessions last from their oldest to newest snapshot"""
+    now = datetime.now()
+    summaries = []
+    for minutes_ago in (20, 10, 0):
+        summary = copy.deepcopy(sample_summary)
+        summary.timestamp = now - timedelta(minutes=minutes_ago)
+        summaries.append(summary)
+    db.store_summaries(summaries)
+    
+    switches = db.get_focus_metrics(hours=1)['context_switches']
+    assert switches['session_count'] == 1
+    assert switches['max_focus_duration'] == 20
+    assert switches['avg_session_length'] == 20
+
+
+def test_clustered_children_migration_keeps_newest_duplicate(tmp_path, monkeypatch, sample_summary):
+    """Test that collapsing duplicate child rows keeps the highest id"""
+    import manager_mccode.services.database as database
+    db_path = tmp_path / "legacy.db"
+    full = database.MIGRATIONS
+    monkeypatch.setattr(database, "MIGRATIONS", [m for m in full if m[0] != "clustered_snapshot_children"])
+    legacy = DatabaseManager(db_path)
+    snapshot_id = legacy.store_summary(sample_summary)
+    with legacy._write_connection() as conn:
+        conn.execute(
+            "INSERT INTO focus_states (snapshot_id, state_type, confidence) VALUES (?, ?, ?)",
+            (snapshot_id, "scattered", 0.4),
+        )
+        conn.commit()
+    legacy.close()
+    
+    monkeypatch.setattr(database, "MIGRATIONS", full)
+    db = DatabaseManager(db_path)
+    with db._read_connection() as conn:
+        rows = conn.execute("SELECT state_type, confidence FROM focus_states").fetchall()
+    assert [tuple(row) for row in rows] == [("scattered", 0.4)]
+    db.close()
+
+
+def test_cancelled_summary_is_not_written(sample_summary):
+    """Test that a summary cancelled while queued is skipped, not stored"""
+    db = DatabaseManager(":memory:")
+    release = threading.Event()
+    db._submit_write(lambda conn: release.wait(5))  # keep the summaries queued
+    
+    cancelled = db.enqueue_summary(copy.deepcopy(sample_summary))
+    kept = db.enqueue_summary(copy.deepcopy(sample_summary))
+    assert cancelled.cancel()
+    release.set()
+    
+    snapshot_id = kept.result(timeout=5)
+    assert db.store_summary(copy.deepcopy(sample_summary)) == snapshot_id + 1
+    with db._read_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM activity_snapshots").fetchone()[0] == 2
+    db.close()
+
+
+def test_cancelled_cleanup_leaves_writer_running(sample_summary):
+    """Test that cancelling a queued cleanup does not stop the writer thread"""
+    db = DatabaseManager(":memory:")
+    release = threading.Event()
+    db._submit_write(lambda conn: release.wait(5))  # keep the cleanup queued
+    
+    async def cancel_cleanup():
+        task = asyncio.create_task(db.cleanup_old_data(days=30))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    
+    asyncio.run(cancel_cleanup())
+    release.set()
+    
+    assert db.enqueue_summary(copy.deepcopy(sample_summary)).result(timeout=5) > 0
+    assert db.store_summary(copy.deepcopy(sample_summary)) > 0
+    db.close()
+
+
+def test_focus_indicator_labels_round_trip(db, sample_summary):
+    """Test that indicator labels survive integer encoding"""
+    summary = copy.deepcopy(sample_summary)
+    summary.timestamp = datetime.now()
+    summary.activities.append(copy.deepcopy(summary.activities[0]))
+    summary.activities[1].focus_indicators.context_switches = "frequent"
+    summary.activities[1].focus_indicators.workspace_organization = "scattered"
+    db.store_summary(summary)
+    
+    indicators = [a.focus_indicators for a in db.get_recent_summaries(hours=1)[0].activities]
+    assert [(i.context_switches, i.workspace_organization) for i in indicators] == [
+        ("low", "organized"),
+        ("unknown", "scattered"),
+    ]
+
+
+def test_session_stats_match_buckets(db, sample_summary):
+    """Test that session totals agree with the 15-minute buckets"""
+    summaries = []
+    for offset, state in ((0, "focused"), (1, "scattered"), (2, "focused"), (3, "focused")):
+        summary = copy.deepcopy(sample_summary)
+        summary.timestamp = datetime.now() - timedelta(minutes=offset)
+        summary.context.attention_state = state
+        summaries.append(summary)
+    db.store_summaries(summaries)
+    
+    stats = db.get_session_stats(hours=1)
+    buckets = db.get_recent_fifteen_min_summaries(hours=1)
+    assert stats['total_snapshots'] == 4
+    assert stats['total_minutes'] == len(buckets) * 15
+    assert stats['focus_percentage'] == pytest.approx(75.0)
+
+
+def test_distribution_counts_between(db, sample_summary):
+    """Test SQL-side category and focus state counts"""
+    summary = copy.deepcopy(sample_summary)
+    summary.timestamp = datetime.now()
+    summary.activities.append(replace(summary.activities[0], category="Research"))
+    db.store_summary(summary)
+    
+    start, end = datetime.now() - timedelta(hours=1), datetime.now() + timedelta(hours=1)
+    assert db.count_activity_categories_between(start, end) == {"Development": 1, "Research": 1}
+    
+    states = db.get_focus_states_between(start, end)
+    assert db.count_focus_states_between(start, end) == {states[0]["state_type"]: 1}
+
+
+def test_hourly_patterns_between(db, sample_summary):
+    """Test that hourly totals match the snapshots they summarize"""
+    base = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0)
+    summaries = []
+    for offset in (0, 30, 240):
+        summary = copy.deepcopy(sample_summary)
+        summary.timestamp = base + timedelta(minutes=offset)
+        summaries.append(summary)
+    summaries[1].activities = []
+    db.store_summaries(summaries)
+    
+    rows = db.get_hourly_patterns_between(base, base + timedelta(hours=5))
+    assert rows == [(10, 2, pytest.approx(41.25), 1), (14, 1, pytest.approx(82.5), 1)]
@@ -13,6 +13,9 @@ def mock_db():
     db.__class__.get_snapshots_between = DatabaseManager.get_snapshots_between
     db.__class__.get_activities_between = DatabaseManager.get_activities_between
     db.__class__.get_focus_states_between = DatabaseManager.get_focus_states_between
+    db.__class__.count_activity_categories_between = DatabaseManager.count_activity_categories_between
+    db.__class__.count_focus_states_between = DatabaseManager.count_focus_states_between
+    db.__class__.get_hourly_patterns_between = DatabaseManager.get_hourly_patterns_between
     
     # Mock snapshot data
     db.get_snapshots_between.return_value = [
@@ -54,6 +57,15 @@ def mock_db():
         {"state_type": "scattered", "confidence": 0.7}
     ]
     
+    # Mock SQL-side counts of the rows above
+    db.count_activity_categories_between.return_value = {
+        "development": 2,
+        "communication": 1,
+        "research": 1
+    }
+    db.count_focus_states_between.return_value = {"focused": 2, "scattered": 1}
+    db.get_hourly_patterns_between.return_value = [(10, 2, 77.5, 4), (14, 1, 40.0, 2)]
+    
     return db
 
 @pytest.fixture
@@ -94,6 +106,8 @@ def test_get_daily_metrics_empty(metrics_collector, mock_db):
     mock_db.get_snapshots_between.return_value = []
     mock_db.get_activities_between.return_value = []
     mock_db.get_focus_states_between.return_value = []
+    mock_db.count_activity_categories_between.return_value = {}
+    mock_db.count_focus_states_between.return_value = {}
     
     metrics = metrics_collector.get_daily_metrics()
     expected_empty_summary = {
@@ -192,4 +206,20 @@ def test_export_timeframe(metrics_collector):
     assert export["timeframe"]["start"] == start.isoformat()
     assert export["timeframe"]["end"] == end.isoformat()
     assert "daily_metrics" in export
-    assert "aggregate_metrics" in export 
\ No newline at end of file
+    assert "aggregate_metrics" in export 
+
+def test_query_results_cached(metrics_collector, mock_db):
+    """Test that repeated range queries reuse cached results"""
+    date = datetime(2024, 1, 1)
+    first = metrics_collector.get_daily_metrics(date)
+    assert metrics_collector.get_daily_metrics(date) == first
+    
+    # Each per-range query hits the database once
+    assert mock_db.get_snapshots_between.call_count == 1
+    assert mock_db.count_activity_categories_between.call_count == 1
+    assert mock_db.get_hourly_patterns_between.call_count == 1
+    
+    metrics_collector.invalidate()
+    metrics_collector.get_daily_metrics(date)
+    assert mock_db.get_snapshots_between.call_count == 2
+    assert mock_db.get_hourly_patterns_between.call_count == 2
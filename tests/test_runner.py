@@ -0,0 +1,47 @@
+import pytest
+import asyncio
+from collections import deque
+from concurrent.futures import Future
+from unittest.mock import AsyncMock, Mock
+
+from manager_mccode.config.settings import settings
+from manager_mccode.services.database import DatabaseError
+from manager_mccode.services.runner import ServiceRunner
+
+
+def test_failed_summary_write_counts_toward_max_errors(monkeypatch):
+    """Test that a summary the writer thread rejects trips the error budget"""
+    failed = Future()
+    failed.set_exception(DatabaseError("Failed to store summaries: disk I/O error"))
+
+    runner = ServiceRunner.__new__(ServiceRunner)
+    runner.running = False
+    runner.error_count = 0
+    runner.MAX_ERRORS = 1
+    runner._failed_writes = deque()
+    runner._setup_signal_handlers = Mock()
+    runner.db = Mock(spec=["enqueue_summary", "cleanup_old_data"])
+    runner.db.enqueue_summary.return_value = failed
+    runner.db.cleanup_old_data = AsyncMock(return_value=(0, 0))
+    runner.image_manager = Mock(spec=["capture_screenshot"])
+    runner.image_manager.capture_screenshot = AsyncMock(return_value=None)
+    runner.batch_processor = Mock(spec=["initialize", "add_screenshot", "is_batch_ready",
+                                        "process_batch", "is_processing"])
+    runner.batch_processor.initialize = AsyncMock()
+    runner.batch_processor.is_batch_ready.return_value = True
+    runner.batch_processor.process_batch = AsyncMock(return_value=[Mock()])
+    runner.batch_processor.is_processing = False
+    runner.analyzer = Mock(spec=[])
+    monkeypatch.setattr(settings, "SCREENSHOT_INTERVAL_SECONDS", 0)
+
+    async def run():
+        runner.shutdown_event = asyncio.Event()
+        await asyncio.wait_for(runner.run(), timeout=5)
+
+    asyncio.run(run())
+
+    # The second pass stops on the failed write before taking a screenshot
+    assert runner.running is False
+    assert runner.image_manager.capture_screenshot.await_count == 1
+    assert runner.db.enqueue_summary.call_count == 1
+    assert not runner._failed_writes